@@ -0,0 +1,244 @@
+import csv
+import os
+import re
+from collections import deque
+
+# --- Allergen engine ---
+# The ingredient -> allergen database is loaded once; every profile change compiles it together with
+# the user's allergies into one Aho-Corasick automaton, so checking an item (or a whole ingredient
+# list) is a single pass over its text no matter how many ingredients or allergies there are.
+
+# What people type in the allergy field -> canonical allergens used in the database
+ALLERGY_ALIASES = {
+    "dairy": ["dairy"], "lactose": ["dairy"], "milk": ["dairy"], "casein": ["dairy"], "whey": ["dairy"],
+    "egg": ["egg"], "eggs": ["egg"],
+    "peanut": ["peanut"], "peanuts": ["peanut"], "groundnut": ["peanut"], "groundnuts": ["peanut"],
+    "tree nut": ["tree_nut"], "tree nuts": ["tree_nut"], "treenuts": ["tree_nut"],
+    "nut": ["peanut", "tree_nut"], "nuts": ["peanut", "tree_nut"],
+    "soy": ["soy"], "soya": ["soy"], "soybean": ["soy"], "soybeans": ["soy"],
+    "wheat": ["wheat", "gluten"], "gluten": ["gluten"], "celiac": ["gluten"], "coeliac": ["gluten"],
+    "fish": ["fish"], "shellfish": ["shellfish"], "crustacean": ["shellfish"], "crustaceans": ["shellfish"],
+    "mollusc": ["mollusc"], "molluscs": ["mollusc"], "mollusk": ["mollusc"], "mollusks": ["mollusc"],
+    "sesame": ["sesame"], "mustard": ["mustard"], "celery": ["celery"], "lupin": ["lupin"],
+    "sulphite": ["sulphites"], "sulphites": ["sulphites"], "sulfite": ["sulphites"], "sulfites": ["sulphites"],
+}
+
+CACHE_SIZE = 8192  # per compiled profile; plenty for a detector's class list plus recipe ingredients
+
+_SEPARATORS = re.compile(r"[_\-/]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(text):
+    """Lowercase, treat detector-style separators (apple_red_1, Dairy/Lactose) as spaces"""
+    return _SPACES.sub(" ", _SEPARATORS.sub(" ", str(text).lower())).strip()
+
+
+def canonical_allergens(allergy):
+    """Canonical allergens for one profile entry; unknown entries stay as their own allergen"""
+    key = normalize(allergy)
+    if key in ALLERGY_ALIASES:
+        return set(ALLERGY_ALIASES[key])
+    parts = [p.strip() for p in re.split(r"[/,&]| and ", str(allergy).lower()) if p.strip()]
+    found = set()
+    for part in parts:
+        found.update(ALLERGY_ALIASES.get(normalize(part), ()))
+    return found or {key}
+
+
+# --- Multi-pattern matcher ---
+class AhoCorasick:
+    """Finds every pattern occurrence in one left-to-right pass; matches respect word boundaries"""
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for pattern, value in patterns:
+            self._add(pattern, value)
+        self._build()
+
+    def _add(self, pattern, value):
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((len(pattern), value))
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        order = []
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        # Fold the failure links into full transition tables (breadth-first, so a node's failure
+        # target is complete before the node): matching is then one dict lookup per character
+        self._delta = [dict(self._goto[0])] + [None] * (len(self._goto) - 1)
+        for node in order:
+            table = dict(self._delta[self._fail[node]])
+            table.update(self._goto[node])
+            self._delta[node] = table
+
+    @property
+    def size(self):
+        return len(self._goto)
+
+    def finditer(self, text):
+        """Yield (start, end, value) for whole-word matches; a trailing plural "s"/"es" still matches"""
+        delta, out = self._delta, self._out
+        node = 0
+        n = len(text)
+        for i, ch in enumerate(text):
+            node = delta[node].get(ch, 0)
+            if not out[node]:
+                continue
+            for length, value in out[node]:
+                start = i - length + 1
+                if start > 0 and text[start - 1].isalnum():
+                    continue
+                end = i + 1
+                if end < n and text[end].isalnum():
+                    if text[end] == "s" and (end + 1 == n or not text[end + 1].isalnum()):
+                        end += 1
+                    elif text[end:end + 2] == "es" and (end + 2 == n or not text[end + 2].isalnum()):
+                        end += 2
+                    else:
+                        continue
+                yield start, end, value
+
+
+# --- Database ---
+class AllergenDatabase:
+    """ingredient -> allergens, with every synonym pointing at the same allergens"""
+
+    def __init__(self, entries):
+        self.entries = entries  # term -> set of canonical allergens
+
+    @classmethod
+    def load(cls, path):
+        """CSV with columns ingredient, allergens (| separated), synonyms (| separated)"""
+        entries = {}
+        if not path or not os.path.exists(path):
+            print(f"[ALLERGENS] No allergen database at {path}, only direct matches will be found")
+            return cls(entries)
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                allergens = {a.strip() for a in (row.get("allergens") or "").split("|") if a.strip()}
+                terms = [row.get("ingredient") or ""] + (row.get("synonyms") or "").split("|")
+                for term in terms:
+                    term = normalize(term)
+                    if term:
+                        entries.setdefault(term, set()).update(allergens)
+        print(f"[ALLERGENS] Loaded {len(entries)} ingredient terms from {os.path.basename(path)}")
+        return cls(entries)
+
+    def compile(self, allergies):
+        return AllergenMatcher(self, allergies)
+
+
+def _singular(term):
+    if term.endswith("ies"):
+        return term[:-3] + "y"
+    if term.endswith("es"):
+        return term[:-2]
+    return term[:-1] if term.endswith("s") else term
+
+
+class AllergenMatcher:
+    """The database compiled against one profile's allergies"""
+
+    def __init__(self, database, allergies):
+        self.allergies = [a for a in (allergies or []) if str(a).strip()]
+        self._reported = {}  # canonical allergen -> the profile entries it came from
+        for allergy in self.allergies:
+            allergens = canonical_allergens(allergy)
+            key = normalize(allergy)
+            if allergens == {key}:
+                # Not a known allergen group: maybe a food from the database ("strawberries")
+                allergens = database.entries.get(key) or database.entries.get(_singular(key)) or allergens
+            for allergen in allergens:
+                self._reported.setdefault(allergen, []).append(allergy.lower())
+
+        # Every database term goes in, even harmless ones: a longer harmless match ("peanut butter"
+        # for a lactose allergy) hides the shorter risky one inside it ("butter")
+        patterns = [(term, ("contains", tuple(sorted(allergens & self._reported.keys()))))
+                    for term, allergens in database.entries.items()]
+        # The allergy text itself ("strawberries", "peanuts") matched directly in the item name
+        for allergy in self.allergies:
+            patterns.append((normalize(allergy), ("direct", allergy.lower())))
+        self._automaton = AhoCorasick(patterns)
+        # Reverse direction of the direct match: an item name inside an allergy ("nut" in "peanuts")
+        self._allergy_text = "\n".join(normalize(a) for a in self.allergies)
+        self._cache = {}
+
+    @property
+    def size(self):
+        return self._automaton.size
+
+    def _matches(self, text):
+        """(start, end, allergies, verb) for every risky match not covered by a longer ingredient match"""
+        matches = list(self._automaton.finditer(text))
+        ingredients = [(start, end) for start, end, (kind, _) in matches if kind == "contains"]
+        for start, end, (kind, value) in matches:
+            if kind == "direct":
+                yield start, end, [value], "may contain"
+            elif value and not any(s <= start and end <= e and (s, e) != (start, end) for s, e in ingredients):
+                yield start, end, [a for allergen in value for a in self._reported[allergen]], "contains"
+
+    def _item_hits(self, item):
+        """{allergy: verb} for one item name; memoised because detector class names repeat"""
+        hits = self._cache.get(item)
+        if hits is not None:
+            return hits
+        text = normalize(item)
+        found = {}
+        for _start, _end, allergies, verb in self._matches(text):
+            for allergy in allergies:
+                if found.get(allergy) != "contains":
+                    found[allergy] = verb
+        if len(text) >= 3 and text in self._allergy_text:
+            for allergy in self.allergies:
+                if text in normalize(allergy):
+                    found.setdefault(allergy.lower(), "may contain")
+        if len(self._cache) >= CACHE_SIZE:
+            self._cache.clear()
+        self._cache[item] = found
+        return found
+
+    def check_item(self, item):
+        """Warnings for one item name: [{"item", "allergy", "warning"}, ...]"""
+        return [{
+            "item": item,
+            "allergy": allergy,
+            "warning": f"⚠️ WARNING: {item} {verb} {allergy} which you're allergic to!",
+        } for allergy, verb in self._item_hits(item).items()]
+
+    def check(self, items):
+        warnings = []
+        for item in items:
+            warnings.extend(self.check_item(item))
+        return warnings
+
+    def scan(self, text):
+        """Allergy hits in free text (a recipe's ingredient list), as {allergy: [matched terms]}"""
+        text = normalize(text)
+        hits = {}
+        for start, end, allergies, _verb in self._matches(text):
+            for allergy in allergies:
+                terms = hits.setdefault(allergy, [])
+                if text[start:end] not in terms:
+                    terms.append(text[start:end])
+        return hits
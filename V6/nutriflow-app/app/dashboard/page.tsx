@@ -21,6 +21,8 @@ export default function DashboardPage() {
   const [mealGenerationLoading, setMealGenerationLoading] = useState(false)
   const [showTutorial, setShowTutorial] = useState(false)
   const [allergyWarnings, setAllergyWarnings] = useState<any[]>([])
+  const [streamingMeal, setStreamingMeal] = useState("")
+  const [sessionId, setSessionId] = useState<string | null>(null)
 
   // Check if this is the user's first time
   useEffect(() => {
@@ -88,6 +90,7 @@ export default function DashboardPage() {
       const data = await response.json()
 
       if (response.ok && data.success) {
+        setSessionId(data.session_id)
         setIsCapturing(true)
         setCaptureStatus('✅ Fridge captured! Now take items out and click "What Was Taken?" when ready.')
       } else {
@@ -100,22 +103,60 @@ export default function DashboardPage() {
     }
   }
 
+  // Follow a background meal job over Server-Sent Events until the LLM is done
+  const streamMealSuggestion = (streamUrl: string) =>
+    new Promise<string>((resolve, reject) => {
+      const source = new EventSource(`http://localhost:8000${streamUrl}`)
+      let text = ""
+
+      source.onmessage = (event) => {
+        text += JSON.parse(event.data).token
+        setStreamingMeal(text)
+      }
+      source.addEventListener("done", (event) => {
+        source.close()
+        resolve(JSON.parse((event as MessageEvent).data).meal_suggestion)
+      })
+      source.addEventListener("error", (event) => {
+        source.close()
+        const data = (event as MessageEvent).data
+        reject(new Error(data ? JSON.parse(data).error : "Lost connection to meal stream"))
+      })
+    })
+
   const handleWhatWasTaken = async () => {
     setLoading(true)
     setMealGenerationLoading(true)
     setError("")
     setAllergyWarnings([])
+    setStreamingMeal("")
     setCaptureStatus("🤖 AI Chef is analyzing what you took and checking for allergies...")
 
     try {
+      // Each capture is its own backend session, so other tabs can't overwrite this baseline
       const response = await fetch("http://localhost:8000/capture-after", {
         method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ session_id: sessionId }),
       })
 
-      const data = await response.json()
+      let data = await response.json()
+
+      // The backend parks the result until the allergy warnings are acknowledged
+      if (response.ok && data.needs_confirmation) {
+        const warningText = data.allergy_warnings.map((warning: any) => warning.warning).join("\n")
+        const confirmed = window.confirm(`${warningText}\n\nDo you want to continue with meal suggestions anyway?`)
+        const confirmResponse = await fetch("http://localhost:8000/confirm-allergies", {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({ confirm: confirmed, session_id: data.session_id }),
+        })
+        data = await confirmResponse.json()
+      }
 
       if (response.ok && data.success) {
-        const mealSuggestions = parseMealSuggestion(data.meal_suggestion, data.taken_items)
+        const mealSuggestion = data.job_id ? await streamMealSuggestion(data.stream_url) : data.meal_suggestion
+        const mealSuggestions = parseMealSuggestion(mealSuggestion, data.taken_items)
         localStorage.setItem("mealSuggestions", JSON.stringify(mealSuggestions))
         localStorage.setItem("takenItems", JSON.stringify(data.taken_items))
         router.push("/results")
@@ -128,10 +169,11 @@ export default function DashboardPage() {
         }
       }
     } catch (err) {
-      setError("Network error. Make sure Python backend is running.")
+      setError(err instanceof Error && err.message ? err.message : "Network error. Make sure Python backend is running.")
     } finally {
       setLoading(false)
       setMealGenerationLoading(false)
+      setStreamingMeal("")
     }
   }
 
@@ -412,6 +454,7 @@ export default function DashboardPage() {
       <LoadingOverlay
         isVisible={mealGenerationLoading}
         message="Analyzing your fridge contents, checking for allergies, and generating personalized meal suggestions with calorie information..."
+        preview={streamingMeal}
       />
     </div>
   )
@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import deque
+
+import metrics
+
+
+class _Pending:
+    def __init__(self, frame):
+        self.frame = frame
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+# --- Micro-batching scheduler ---
+class MicroBatcher:
+    """Collects concurrent single-frame requests and runs them through batch_fn together.
+
+    A batch closes when max_batch frames are waiting or the oldest has waited max_wait_ms;
+    batch_fn(frames) must return one result per frame, in order. Callers block in submit() and
+    get their own result back (or the batch's exception).
+    """
+
+    def __init__(self, batch_fn, max_batch=4, max_wait_ms=5.0, name="detector"):
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._running = False
+        self._thread = None
+        self.batches = 0
+        self.frames = 0
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return self
+            self._running = True
+        self._thread = threading.Thread(target=self._loop, name=f"batcher-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+    def submit(self, frame):
+        pending = _Pending(frame)
+        with self._cond:
+            if not self._running:
+                raise RuntimeError("Batcher is not running")
+            self._queue.append(pending)
+            self._cond.notify_all()
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _next_batch(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._queue or not self._running)
+            if not self._running:
+                return None
+            # The first frame opens the window; stop early once the batch is full
+            deadline = self._queue[0].enqueued + self.max_wait
+            while len(self._queue) < self.max_batch and self._running:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            count = min(self.max_batch, len(self._queue))
+            return [self._queue.popleft() for _ in range(count)]
+
+    def _loop(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                break
+            started = time.perf_counter()
+            for pending in batch:
+                metrics.batch_wait_seconds.observe(started - pending.enqueued, batcher=self.name)
+            metrics.batch_size.observe(len(batch), batcher=self.name)
+            try:
+                results = self.batch_fn([pending.frame for pending in batch])
+                for pending, result in zip(batch, results):
+                    pending.result = result
+            except Exception as e:
+                for pending in batch:
+                    pending.error = e
+            for pending in batch:
+                pending.done.set()
+            with self._cond:
+                self.batches += 1
+                self.frames += len(batch)
+
+        # Anyone still queued at shutdown gets an error rather than blocking forever
+        with self._cond:
+            leftover, self._queue = list(self._queue), deque()
+        for pending in leftover:
+            pending.error = RuntimeError("Batcher stopped")
+            pending.done.set()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "max_batch": self.max_batch,
+                "max_wait_ms": round(self.max_wait * 1000, 2),
+                "batches": self.batches,
+                "frames": self.frames,
+                "mean_batch": round(self.frames / self.batches, 2) if self.batches else 0.0,
+                "queued": len(self._queue),
+            }
@@ -0,0 +1,91 @@
+"""Micro-benchmark: compiled allergen matcher vs the original nested-loop check_allergies.
+
+Scales the ingredient list and the number of allergies and reports per-check latency. The two
+"vs legacy" columns are legacy p50 / matcher p50, so below 1.0x the matcher is the slower one:
+
+    python benchmark_allergens.py --items 10 100 1000 10000 --allergies 2 8 64 512 --repeat 20
+"""
+import argparse
+import random
+import time
+
+import config
+from allergens import ALLERGY_ALIASES, AllergenDatabase
+from perf_stats import summarize
+
+
+def legacy_check(taken_items, allergies):
+    """The pre-index check_allergies(), kept verbatim in behaviour for comparison"""
+    warnings = []
+    user_allergies = [allergy.lower() for allergy in allergies]
+    for item in taken_items:
+        item_lower = item.lower()
+        for allergy in user_allergies:
+            if allergy in item_lower or item_lower in allergy:
+                warnings.append({"item": item, "allergy": allergy})
+        allergen_mappings = {
+            "milk": ["lactose", "dairy"], "cheese": ["lactose", "dairy"], "butter": ["lactose", "dairy"],
+            "yogurt": ["lactose", "dairy"], "bread": ["gluten", "wheat"], "pasta": ["gluten", "wheat"],
+            "nuts": ["peanuts", "tree nuts"], "peanut": ["peanuts"], "fish": ["fish"], "salmon": ["fish"],
+            "tuna": ["fish"], "shrimp": ["shellfish"], "crab": ["shellfish"], "eggs": ["eggs"],
+        }
+        if item_lower in allergen_mappings:
+            for potential_allergen in allergen_mappings[item_lower]:
+                if potential_allergen in user_allergies:
+                    warnings.append({"item": item, "allergy": potential_allergen})
+    return warnings
+
+
+def time_runs(fn, repeat, setup=None):
+    """Latency summary of fn(); setup() runs untimed before each call and its result is passed in"""
+    samples = []
+    for _ in range(repeat):
+        arg = setup() if setup is not None else None
+        started = time.perf_counter()
+        fn(arg) if setup is not None else fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Allergen matcher micro-benchmark")
+    parser.add_argument("--db", default=config.ALLERGEN_DB)
+    parser.add_argument("--items", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--allergies", type=int, nargs="+", default=[2, 8, 64, 512])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    db = AllergenDatabase.load(args.db)
+    terms = sorted(db.entries)
+    # Real allergy names first, then arbitrary foods as "allergies" to grow the pattern set
+    allergy_pool = sorted(ALLERGY_ALIASES) + [t for t in terms if t not in ALLERGY_ALIASES]
+
+    print(f"\n{'items':>7}{'allergies':>11}{'compile ms':>12}{'legacy p50':>12}{'cold p50':>10}"
+          f"{'warm p50':>10}{'warm p95':>10}{'cold vs legacy':>16}{'warm (memoised) vs legacy':>27}"
+          f"{'legacy hits':>13}{'index hits':>12}")
+    for n_allergies in args.allergies:
+        allergies = allergy_pool[:n_allergies]
+        compile_stats = time_runs(lambda: db.compile(allergies), max(3, args.repeat // 4))
+        for n_items in args.items:
+            items = [rng.choice(terms) if rng.random() < 0.7 else f"item_{rng.randrange(10 ** 6)}"
+                     for _ in range(n_items)]
+            legacy = time_runs(lambda: legacy_check(items, allergies), args.repeat)
+            # Cold: a freshly compiled matcher scans every item; warm: repeated names hit the memo
+            cold = time_runs(lambda matcher: matcher.check(items), args.repeat, setup=lambda: db.compile(allergies))
+            matcher = db.compile(allergies)
+            index_hits = len(matcher.check(items))
+            warm = time_runs(lambda: matcher.check(items), args.repeat)
+            cold_speedup = legacy["p50_ms"] / cold["p50_ms"] if cold["p50_ms"] else float("inf")
+            warm_speedup = legacy["p50_ms"] / warm["p50_ms"] if warm["p50_ms"] else float("inf")
+            print(f"{n_items:>7}{n_allergies:>11}{compile_stats['p50_ms']:>12}{legacy['p50_ms']:>12}"
+                  f"{cold['p50_ms']:>10}{warm['p50_ms']:>10}{warm['p95_ms']:>10}{cold_speedup:>15.2f}x{warm_speedup:>26.1f}x"
+                  f"{len(legacy_check(items, allergies)):>13}{index_hits:>12}")
+    print("\nCold is a freshly compiled matcher (every item scanned), what a new profile pays on top of compile ms;"
+          "\nwarm repeats the same items against one matcher and mostly measures its memo."
+          "\nThe legacy check only knows 14 foods, so it finds far fewer warnings than the index.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Micro-batching benchmark: detection throughput vs added latency for a grid of max-batch / max-wait.
+
+N client threads each detect M frames as fast as they can (the tracker and capture requests in the
+server behave the same way). The first row is the unbatched baseline:
+
+    python benchmark_batching.py --clients 4 --frames 25 --max-batch 2 4 8 --max-wait-ms 2 5 10
+    python benchmark_batching.py --workers 2 ...     # through the inference worker pool
+    python benchmark_batching.py --images bench_frames ...
+"""
+import argparse
+import glob
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import config
+from batching import MicroBatcher
+from detectors import load_detector
+from inference_pool import InferencePool
+from perf_stats import summarize
+
+
+def load_frames(folder, count, width, height):
+    """Images from a folder if given, otherwise random noise frames of the camera resolution"""
+    if folder:
+        paths = sorted(p for p in glob.glob(os.path.join(folder, "*"))
+                       if p.lower().endswith((".jpg", ".jpeg", ".png", ".bmp")))
+        frames = [frame for frame in (cv2.imread(p) for p in paths[:count]) if frame is not None]
+        if frames:
+            return frames
+    rng = np.random.default_rng(7)
+    return [rng.integers(0, 255, (height, width, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def run_clients(detect, frames, clients, per_client):
+    """Every client thread calls detect() per_client times; returns (wall seconds, per-call latencies)"""
+    latencies = []
+    lock = threading.Lock()
+    start = threading.Barrier(clients + 1)
+
+    def client(offset):
+        local = []
+        start.wait()
+        for i in range(per_client):
+            frame = frames[(offset + i) % len(frames)]
+            began = time.perf_counter()
+            detect(frame)
+            local.append(time.perf_counter() - began)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    began = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - began, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detector micro-batching benchmark")
+    parser.add_argument("--weights", default=config.MODEL_PATH)
+    parser.add_argument("--backend", default=config.DETECTOR_BACKEND)
+    parser.add_argument("--workers", type=int, default=0, help="inference worker processes (0 = in-process)")
+    parser.add_argument("--images", help="folder of frames; random frames when omitted")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--frames", type=int, default=25, help="detections per client")
+    parser.add_argument("--max-batch", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--max-wait-ms", type=float, nargs="+", default=[2.0, 5.0, 10.0])
+    args = parser.parse_args()
+
+    frames = load_frames(args.images, 16, config.CAMERA_WIDTH, config.CAMERA_HEIGHT)
+    if args.workers > 0:
+        detector = InferencePool(args.weights, args.backend, imgsz=config.DETECTOR_IMGSZ, workers=args.workers,
+                                 max_pending=max(8, args.clients), timeout=60.0,
+                                 batch=max(args.max_batch)).start()
+    else:
+        detector = load_detector(args.weights, args.backend, imgsz=config.DETECTOR_IMGSZ, batch=max(args.max_batch))
+        detector.warm_up(2)
+
+    print(f"\n{args.clients} clients x {args.frames} frames, backend {detector.backend}, "
+          f"{args.workers or 'no'} worker processes")
+    print(f"{'max batch':>10}{'max wait ms':>13}{'frames/s':>10}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'p99 ms':>9}{'mean batch':>12}{'speedup':>9}")
+
+    wall, latencies = run_clients(detector.detect, frames, args.clients, args.frames)
+    baseline = args.clients * args.frames / wall
+    stats = summarize(latencies)
+    print(f"{'-':>10}{'-':>13}{baseline:>10.1f}{stats['p50_ms']:>9}{stats['p95_ms']:>9}"
+          f"{stats['p99_ms']:>9}{1.0:>12}{1.0:>8.2f}x")
+
+    for max_batch in args.max_batch:
+        for max_wait_ms in args.max_wait_ms:
+            batcher = MicroBatcher(detector.detect_batch, max_batch=max_batch, max_wait_ms=max_wait_ms).start()
+            wall, latencies = run_clients(batcher.submit, frames, args.clients, args.frames)
+            batcher.stop()
+            throughput = args.clients * args.frames / wall
+            stats = summarize(latencies)
+            print(f"{max_batch:>10}{max_wait_ms:>13}{throughput:>10.1f}{stats['p50_ms']:>9}{stats['p95_ms']:>9}"
+                  f"{stats['p99_ms']:>9}{batcher.stats()['mean_batch']:>12}{throughput / baseline:>8.2f}x")
+
+    if isinstance(detector, InferencePool):
+        detector.stop()
+
+
+if __name__ == "__main__":
+    main()
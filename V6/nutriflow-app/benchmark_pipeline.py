@@ -0,0 +1,176 @@
+"""Offline end-to-end benchmark: stored before/after frames -> detect -> diff -> allergies -> prompt -> LLM.
+
+Frame pairs are read from a folder as <name>_before.jpg / <name>_after.jpg (any image extension).
+The LLM is served by ollama_stub.py in a child process, so no camera or llama3 is needed:
+
+    python benchmark_pipeline.py --pairs bench_frames --iterations 5 --output bench_results.json
+"""
+import argparse
+import glob
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import config
+from perf_stats import summarize
+
+STAGES = ("load_frames", "detect_before", "detect_after", "diff", "allergy_check", "prompt",
+          "llm_ttft", "llm_total", "end_to_end")
+
+
+def find_pairs(folder):
+    pairs = []
+    for before in sorted(glob.glob(os.path.join(folder, "*_before.*"))):
+        stem, _ = before.rsplit("_before", 1)
+        matches = glob.glob(stem + "_after.*")
+        if matches:
+            pairs.append((os.path.basename(stem), before, matches[0]))
+    return pairs
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_stub(port, ttft, token_delay, tokens):
+    stub = subprocess.Popen([
+        sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "ollama_stub.py"),
+        "--port", str(port), "--ttft", str(ttft), "--token-delay", str(token_delay), "--tokens", str(tokens),
+    ])
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return stub
+        except OSError:
+            time.sleep(0.05)
+    stub.kill()
+    raise SystemExit("Ollama stub did not start")
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline NutriFlow pipeline benchmark")
+    parser.add_argument("--pairs", required=True, help="folder with <name>_before.jpg / <name>_after.jpg")
+    parser.add_argument("--iterations", type=int, default=3, help="passes over all pairs")
+    parser.add_argument("--backend", default=config.DETECTOR_BACKEND, help="detector backend")
+    parser.add_argument("--stub-ttft", type=float, default=0.4)
+    parser.add_argument("--stub-token-delay", type=float, default=0.02)
+    parser.add_argument("--stub-tokens", type=int, default=300)
+    parser.add_argument("--use-cache", action="store_true", help="go through the (in-memory) meal cache")
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    pairs = find_pairs(args.pairs)
+    if not pairs:
+        raise SystemExit(f"No *_before/*_after frame pairs in {args.pairs}")
+
+    port = free_port()
+    stub = start_stub(port, args.stub_ttft, args.stub_token_delay, args.stub_tokens)
+
+    # Importing the server opens no camera and loads no model until start_backend()
+    import cv2
+
+    import nutriflow_server as server
+    from detectors import load_detector
+    from meal_cache import MealCache
+    from profile_store import ProfileStore
+
+    server.llm.base_url = f"http://127.0.0.1:{port}"
+    server.meal_cache = MealCache(path=None)  # never touch the unit's on-disk cache or profiles
+    server.profiles = ProfileStore(None, server.DEFAULT_PROFILE)
+
+    try:
+        server.detector = load_detector(config.MODEL_PATH, args.backend, imgsz=config.DETECTOR_IMGSZ)
+        server.detector.warm_up(config.DETECTOR_WARMUP_RUNS)
+        server.llm.warm_up()
+
+        timings = {stage: [] for stage in STAGES}
+        runs = 0
+        bench_started = time.perf_counter()
+        for _ in range(args.iterations):
+            for _name, before_path, after_path in pairs:
+                started = time.perf_counter()
+
+                t = time.perf_counter()
+                before_frame, after_frame = cv2.imread(before_path), cv2.imread(after_path)
+                timings["load_frames"].append(time.perf_counter() - t)
+
+                t = time.perf_counter()
+                before_items = server.detect_items_from_frame(before_frame)
+                timings["detect_before"].append(time.perf_counter() - t)
+
+                t = time.perf_counter()
+                after_items = server.detect_items_from_frame(after_frame)
+                timings["detect_after"].append(time.perf_counter() - t)
+
+                t = time.perf_counter()
+                taken = Counter(before_items) - Counter(after_items)
+                timings["diff"].append(time.perf_counter() - t)
+
+                t = time.perf_counter()
+                server.check_allergies(taken)
+                timings["allergy_check"].append(time.perf_counter() - t)
+
+                if not taken:
+                    # The real pipeline would stop here; keep the LLM stage measured with the before set
+                    taken = Counter(before_items) or Counter({"apple": 1})
+
+                t = time.perf_counter()
+                prompt = server.build_meal_prompt(taken)
+                timings["prompt"].append(time.perf_counter() - t)
+
+                t = time.perf_counter()
+                first_token = None
+                stream = server.cached_meal_stream(taken) if args.use_cache else server.llm.stream(prompt)
+                for _token in stream:
+                    if first_token is None:
+                        first_token = time.perf_counter() - t
+                timings["llm_ttft"].append(first_token if first_token is not None else time.perf_counter() - t)
+                timings["llm_total"].append(time.perf_counter() - t)
+
+                timings["end_to_end"].append(time.perf_counter() - started)
+                runs += 1
+        elapsed = time.perf_counter() - bench_started
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "config": {
+            "pairs": len(pairs),
+            "iterations": args.iterations,
+            "detector_backend": server.detector.backend,
+            "imgsz": config.DETECTOR_IMGSZ,
+            "stub": {"ttft": args.stub_ttft, "token_delay": args.stub_token_delay, "tokens": args.stub_tokens},
+            "use_cache": args.use_cache,
+        },
+        "runs": runs,
+        "throughput_pairs_per_s": round(runs / elapsed, 3) if elapsed else None,
+        "stages": {stage: summarize(values) for stage, values in timings.items()},
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n{'stage':<16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, stats in results["stages"].items():
+        print(f"{stage:<16}{stats.get('p50_ms', '-'):>10}{stats.get('p95_ms', '-'):>10}{stats.get('p99_ms', '-'):>10}")
+    print(f"\n{runs} runs, {results['throughput_pairs_per_s']} pairs/s -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+import re
+import threading
+from collections import Counter, OrderedDict
+
+import tracing
+from frame_broadcaster import FrameBroadcaster
+from frame_capture import CameraCapture
+from inventory import InventoryTracker
+from motion_gate import MotionGate
+
+CAMERA_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+
+
+def parse_camera_spec(spec, default_source):
+    """"main=2,door=rtsp://..." -> [("main", "2"), ("door", "rtsp://...")]; empty -> one camera "main" """
+    if not spec or not spec.strip():
+        return [("main", default_source)]
+    cameras = []
+    for entry in spec.split(","):
+        camera_id, sep, source = entry.strip().partition("=")
+        camera_id, source = camera_id.strip(), source.strip()
+        if not sep or not source or not CAMERA_ID_PATTERN.match(camera_id):
+            raise ValueError(f"Bad camera entry {entry!r}, expected id=source")
+        if camera_id in (c for c, _ in cameras):
+            raise ValueError(f"Camera {camera_id!r} is listed twice")
+        cameras.append((camera_id, source))
+    return cameras
+
+
+def merge_snapshots(snapshots):
+    """One fridge view from per-camera inventory snapshots, keeping what each camera saw"""
+    items = Counter()
+    for snapshot in snapshots.values():
+        items.update(snapshot["items"])
+    return {
+        "items": items,
+        "by_camera": {camera_id: Counter(s["items"]) for camera_id, s in snapshots.items()},
+        "seq": {camera_id: s["seq"] for camera_id, s in snapshots.items()},
+        "timestamp": min(s["timestamp"] for s in snapshots.values()),
+        "samples": min(s["samples"] for s in snapshots.values()),
+    }
+
+
+def taken_between(before_by_camera, after_by_camera):
+    """(taken, taken_by_camera) between two per-camera inventories.
+
+    Only cameras present in both count, so a camera that dropped out doesn't look like an empty
+    shelf. Totals are compared, so an item moved from one shelf to another is not "taken".
+    """
+    common = [camera_id for camera_id in before_by_camera if camera_id in after_by_camera]
+    before, after = Counter(), Counter()
+    for camera_id in common:
+        before.update(before_by_camera[camera_id])
+        after.update(after_by_camera[camera_id])
+    taken = before - after
+    by_camera = {}
+    for camera_id in common:
+        missing = before_by_camera[camera_id] - after_by_camera[camera_id]
+        attributed = {item: min(count, taken[item]) for item, count in missing.items() if item in taken}
+        if attributed:
+            by_camera[camera_id] = attributed
+    return taken, by_camera
+
+
+# --- One camera ---
+class Camera:
+    """A camera with its own capture thread, frame ring, MJPEG broadcaster and background inventory.
+
+    Detection goes through the detect_fn shared by every camera (the server's batcher / worker pool);
+    `inferences` counts the detector calls this camera caused.
+    """
+
+    def __init__(self, camera_id, source, detect_fn, capacity=8, shared=False, quality=80,
+                 window=5, interval=1.0, idle_interval=5.0, max_tiers=6, tier_idle=10.0):
+        self.id = camera_id
+        self.capture = CameraCapture(source, capacity=capacity, shared=shared)
+        self.ring = self.capture.ring
+        self.broadcaster = FrameBroadcaster(self.ring, quality=quality, name=camera_id, max_tiers=max_tiers,
+                                            idle_timeout=tier_idle)
+        # Static shelf -> reuse the previous detection; a scene change wakes YOLO right away
+        self.gate = MotionGate(mean_threshold=4.0, changed_fraction=0.02, max_reuse_age=30.0)
+        self.inventory = InventoryTracker(self.ring, self._detect, window=window, interval=interval,
+                                          idle_interval=idle_interval, gate=self.gate, gate_interval=0.25)
+        self._detect_fn = detect_fn
+        self._lock = threading.Lock()
+        self.inferences = 0
+
+    def _detect(self, frame):
+        with self._lock:
+            self.inferences += 1
+        return self._detect_fn(frame)
+
+    def detect_now(self):
+        """Synchronous detection on this camera's newest frame, fed into its tracker; None without a frame"""
+        if self._observe(record_reused=True) is None:
+            return None
+        return self.inventory.snapshot()
+
+    def observe(self):
+        """Unsmoothed snapshot of the newest frame; None without a frame.
+
+        The tracker's majority vote needs several samples before a removed item drops out. This
+        sees it at once: the gate reuses its last detection only if the scene hasn't changed since.
+        """
+        return self._observe(record_reused=False)
+
+    def _observe(self, record_reused):
+        with tracing.span("frame_acquire"):
+            view = self.ring.latest()
+        if view is None:
+            return None
+        with view:
+            with tracing.span("detect"):
+                items, ran = self.gate.detect(view.frame, self._detect)
+            tracing.annotate(**{f"{self.id}_frame_seq": view.seq, f"{self.id}_inference_skipped": not ran})
+            if ran or record_reused:
+                self.inventory.record(items, view.seq, view.timestamp)
+            return {"items": Counter(items), "seq": view.seq, "timestamp": view.timestamp, "samples": 1}
+
+    def stats(self):
+        capture = self.capture
+        return {
+            "source": capture.source.name,
+            "fps": round(capture.fps, 2),
+            "frames_read": capture.frames_read,
+            "read_failures": capture.read_failures,
+            "dropped_frames": self.ring.dropped,
+            "latest_seq": self.ring.latest_seq,
+            "stream_clients": self.broadcaster.subscribers,
+            "stream_tiers": self.broadcaster.tiers(),
+            "inferences": self.inferences,
+            "motion_gate": self.gate.stats(),
+        }
+
+
+# --- Registry ---
+class CameraRegistry:
+    """Every configured camera; the first one is the default (/video-feed, the desktop preview)"""
+
+    def __init__(self, cameras=()):
+        self._cameras = OrderedDict()
+        for camera in cameras:
+            self.add(camera)
+
+    def add(self, camera):
+        if camera.id in self._cameras:
+            raise ValueError(f"Camera {camera.id!r} already registered")
+        self._cameras[camera.id] = camera
+        return camera
+
+    def get(self, camera_id):
+        return self._cameras.get(camera_id)
+
+    @property
+    def default(self):
+        return next(iter(self._cameras.values()))
+
+    def ids(self):
+        return list(self._cameras)
+
+    def rings(self):
+        return [camera.ring for camera in self]
+
+    def __iter__(self):
+        return iter(list(self._cameras.values()))
+
+    def __len__(self):
+        return len(self._cameras)
+
+    def per_camera(self, fn):
+        """{camera_id: fn(camera)}, the shape labelled metric callbacks expect"""
+        return {camera.id: fn(camera) for camera in self}
+
+    # Lifecycle
+    def start_capture(self, first_frame_timeout=10.0):
+        """Open every camera and wait for its first frame; returns the ids that produced none"""
+        for camera in self:
+            try:
+                camera.capture.start()
+            except Exception as e:
+                print(f"[CAMERA] {camera.id}: failed to open ({e})")
+        failed = []
+        for camera in self:
+            first = camera.ring.wait_for(0, timeout=first_frame_timeout)
+            if first is None:
+                print(f"[CAMERA] {camera.id}: no frames from {camera.capture.source.name}")
+                failed.append(camera.id)
+            else:
+                first.release()
+        return failed
+
+    def start_streams(self):
+        for camera in self:
+            camera.broadcaster.start()
+
+    def start_inventory(self):
+        for camera in self:
+            camera.inventory.start()
+
+    def stop(self):
+        for camera in self:
+            camera.inventory.stop()
+            camera.broadcaster.stop()
+            camera.capture.stop()
+
+    def activate(self):
+        for camera in self:
+            camera.inventory.activate()
+
+    def deactivate(self):
+        for camera in self:
+            camera.inventory.deactivate()
+
+    # Inventory
+    def latest_seqs(self):
+        return self.per_camera(lambda camera: camera.ring.latest_seq)
+
+    def snapshot(self, max_age=None, refresh=False):
+        """Merged inventory of all cameras, or None if no camera has one.
+
+        With refresh, cameras whose tracker is missing or older than max_age run a detection now
+        (in parallel, so they can share a batch).
+        """
+        snapshots, stale = {}, []
+        for camera in self:
+            snapshot = camera.inventory.snapshot(max_age=max_age)
+            if snapshot is None:
+                stale.append(camera)
+            else:
+                snapshots[camera.id] = snapshot
+        if refresh and stale:
+            snapshots.update(self._each(stale, Camera.detect_now))
+        return merge_snapshots(snapshots) if snapshots else None
+
+    def observe(self):
+        """Merged unsmoothed view of every camera's newest frame (see Camera.observe), or None"""
+        snapshots = self._each(list(self), Camera.observe)
+        return merge_snapshots(snapshots) if snapshots else None
+
+    def _each(self, cameras, fn):
+        """{camera_id: fn(camera)} for the cameras that returned something, run in parallel"""
+        if len(cameras) == 1:
+            # Inline, so the detection shows up in the caller's trace
+            snapshot = fn(cameras[0])
+            return {cameras[0].id: snapshot} if snapshot is not None else {}
+        results = {}
+        errors = []
+
+        def run(camera):
+            try:
+                snapshot = fn(camera)
+            except Exception as e:
+                errors.append(e)
+                return
+            if snapshot is not None:
+                results[camera.id] = snapshot
+
+        threads = [threading.Thread(target=run, args=(camera,), daemon=True) for camera in cameras]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors and not results:
+            raise errors[0]
+        return results
+
+    def gate_stats(self):
+        """Motion gate totals across cameras"""
+        checks = skips = runs = 0
+        for camera in self:
+            stats = camera.gate.stats()
+            checks, skips, runs = checks + stats["checks"], skips + stats["skips"], runs + stats["runs"]
+        return {"checks": checks, "skips": skips, "runs": runs,
+                "hit_rate": round(skips / checks, 3) if checks else 0.0}
+
+    def stats(self):
+        stats = self.per_camera(lambda camera: camera.stats())
+        total = sum(s["inferences"] for s in stats.values())
+        for s in stats.values():
+            s["inference_share"] = round(s["inferences"] / total, 3) if total else 0.0
+        return stats
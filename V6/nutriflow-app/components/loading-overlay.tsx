@@ -3,9 +3,10 @@
 interface LoadingOverlayProps {
   isVisible: boolean
   message?: string
+  preview?: string
 }
 
-export function LoadingOverlay({ isVisible, message = "Loading..." }: LoadingOverlayProps) {
+export function LoadingOverlay({ isVisible, message = "Loading...", preview }: LoadingOverlayProps) {
   if (!isVisible) return null
 
   return (
@@ -18,6 +19,11 @@ export function LoadingOverlay({ isVisible, message = "Loading..." }: LoadingOve
         <div className="text-center">
           <h3 className="text-lg font-semibold text-gray-800 mb-2">🤖 AI Chef at Work</h3>
           <p className="text-gray-600">{message}</p>
+          {preview && (
+            <pre className="mt-3 max-h-40 overflow-y-auto whitespace-pre-wrap text-left text-xs text-gray-700 bg-gray-50 rounded p-2">
+              {preview}
+            </pre>
+          )}
           <div className="flex justify-center space-x-1 mt-3">
             <div className="w-2 h-2 bg-green-500 rounded-full animate-bounce"></div>
             <div className="w-2 h-2 bg-green-500 rounded-full animate-bounce" style={{ animationDelay: "0.1s" }}></div>
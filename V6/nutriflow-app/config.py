@@ -0,0 +1,85 @@
+import os
+
+# --- Backend configuration ---
+# Every value can be overridden with an environment variable of the same name prefixed NUTRIFLOW_.
+
+
+def _env(name, default):
+    return os.environ.get(f"NUTRIFLOW_{name}", default)
+
+
+def _env_int(name, default):
+    return int(_env(name, default))
+
+
+def _env_float(name, default):
+    return float(_env(name, default))
+
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# HTTP
+HOST = _env("HOST", "0.0.0.0")
+PORT = _env_int("PORT", 8000)
+
+# Camera / frame source: a device index ("2"), a video file, a folder of images or an rtsp:// URL
+CAMERA_SOURCE = _env("CAMERA_SOURCE", "2")
+# Several cameras (shelves, door bins): "main=2,door=3"; each gets its own capture, stream and inventory.
+# Empty means one camera called "main" reading CAMERA_SOURCE
+CAMERAS = _env("CAMERAS", "")
+SOURCE_REALTIME = _env("SOURCE_REALTIME", "1") == "1"  # files/folders: real time, or as fast as possible
+SOURCE_FPS = _env_float("SOURCE_FPS", 10.0)             # playback rate for image folders
+SOURCE_LOOP = _env("SOURCE_LOOP", "1") == "1"
+CAMERA_WIDTH = _env_int("CAMERA_WIDTH", 1280)
+CAMERA_HEIGHT = _env_int("CAMERA_HEIGHT", 720)
+FRAME_RING_SIZE = _env_int("FRAME_RING_SIZE", 8)
+SHARED_FRAMES = _env("SHARED_FRAMES", "1") == "1"  # ring in shared memory so worker processes can read it
+STREAM_JPEG_QUALITY = _env_int("STREAM_JPEG_QUALITY", 80)
+# /video-feed?w=&fps=&q= tiers: how many one camera encodes at once, and how long an unwatched one lives
+STREAM_MAX_TIERS = _env_int("STREAM_MAX_TIERS", 6)
+STREAM_TIER_IDLE = _env_float("STREAM_TIER_IDLE", 10.0)
+VIDEO_FRAME_MAX_WAIT = _env_float("VIDEO_FRAME_MAX_WAIT", 25.0)  # longest /video-frame?after= long-poll
+
+# Detector
+MODEL_PATH = _env("MODEL_PATH", os.path.join(REPO_ROOT, "V4", "weights.pt"))
+DETECTOR_BACKEND = _env("DETECTOR_BACKEND", "torch")  # torch | onnx | openvino | int8
+DETECTOR_IMGSZ = _env_int("DETECTOR_IMGSZ", 640)
+DETECTOR_WARMUP_RUNS = _env_int("DETECTOR_WARMUP_RUNS", 2)
+# Inference worker processes (0 runs YOLO in the Flask process); tasks beyond the queue get a 503
+INFERENCE_WORKERS = _env_int("INFERENCE_WORKERS", 0)
+INFERENCE_QUEUE = _env_int("INFERENCE_QUEUE", 8)
+INFERENCE_TIMEOUT = _env_float("INFERENCE_TIMEOUT", 10.0)
+# Micro-batching: concurrent detections are grouped up to this size / wait (1 disables)
+DETECT_MAX_BATCH = _env_int("DETECT_MAX_BATCH", 1)
+DETECT_MAX_WAIT_MS = _env_float("DETECT_MAX_WAIT_MS", 5.0)
+
+# Background inventory
+INVENTORY_INTERVAL = _env_float("INVENTORY_INTERVAL", 1.0)            # seconds between detections during a capture
+INVENTORY_IDLE_INTERVAL = _env_float("INVENTORY_IDLE_INTERVAL", 5.0)  # otherwise (0 disables)
+INVENTORY_WINDOW = _env_int("INVENTORY_WINDOW", 5)                    # detections that vote on each class count
+INVENTORY_MAX_AGE = _env_float("INVENTORY_MAX_AGE", 3.0)              # older snapshots trigger a fresh detection
+
+# Capture sessions: concurrent before/after captures and how long an untouched one stays open
+MAX_SESSIONS = _env_int("MAX_SESSIONS", 8)
+SESSION_IDLE_TIMEOUT = _env_float("SESSION_IDLE_TIMEOUT", 600.0)
+# A repeated /capture-after for the same session gets the first one's result for this long after it finished
+CAPTURE_COALESCE_LINGER = _env_float("CAPTURE_COALESCE_LINGER", 2.0)
+
+# Profiles: SQLite file (empty keeps profiles in memory only); requests without a user id use DEFAULT_USER
+PROFILE_DB = _env("PROFILE_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles.db"))
+DEFAULT_USER = _env("DEFAULT_USER", "default")
+
+# Meal suggestion cache: JSON file it survives restarts in (empty keeps it in memory only)
+MEAL_CACHE = _env("MEAL_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "meal_cache.json"))
+
+# Allergens: CSV of ingredient,allergens,synonyms (| separated); point at a larger export to extend coverage
+ALLERGEN_DB = _env("ALLERGEN_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "allergens.csv"))
+
+# LLM
+OLLAMA_URL = _env("OLLAMA_URL", "http://localhost:11434")
+LLM_MODEL = _env("LLM_MODEL", "llama3")
+LLM_KEEP_ALIVE = _env("LLM_KEEP_ALIVE", "30m")
+LLM_NUM_PREDICT = _env_int("LLM_NUM_PREDICT", 900)
+
+# Admin endpoints (/admin/*): when set, requests must send it in the X-Admin-Token header
+ADMIN_TOKEN = _env("ADMIN_TOKEN", "")
@@ -0,0 +1,139 @@
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+import metrics
+
+BACKENDS = ("torch", "onnx", "openvino", "int8")
+
+
+class DetectorNotReady(RuntimeError):
+    pass
+
+
+def exported_path(weights, backend):
+    """Where ultralytics puts the exported model for a given .pt file"""
+    stem, _ = os.path.splitext(weights)
+    if backend == "onnx":
+        return stem + ".onnx"
+    if backend == "openvino":
+        return stem + "_openvino_model"
+    if backend == "int8":
+        # Built by quantize_detector.py, which needs calibration frames
+        return stem + "_int8_openvino_model"
+    return weights
+
+
+def export_weights(weights, backend, imgsz=640, **export_args):
+    """Export PyTorch weights to a CPU runtime format and return the exported path"""
+    if backend not in BACKENDS or backend in ("torch", "int8"):
+        raise ValueError(f"Cannot export to backend {backend!r}")
+    from ultralytics import YOLO
+
+    print(f"[DETECTOR] Exporting {weights} to {backend}...")
+    return YOLO(weights).export(format=backend, imgsz=imgsz, **export_args)
+
+
+# --- Detector ---
+class Detector:
+    """YOLO model behind one interface: results expose names/boxes whatever runtime runs them"""
+
+    def __init__(self, model, backend, path, imgsz=640):
+        self.model = model
+        self.backend = backend
+        self.path = path
+        self.imgsz = imgsz
+        self.names = model.names
+        self._lock = threading.Lock()  # ultralytics predictors are not safe to share between threads
+        self._batching = None  # unknown until the first multi-frame call; static-shape exports cannot batch
+
+    def predict(self, frame):
+        with self._lock:
+            started = time.perf_counter()
+            results = self.model(frame, imgsz=self.imgsz, verbose=False)[0]
+        metrics.detector_inference_seconds.observe(time.perf_counter() - started, backend=self.backend)
+        return results
+
+    def predict_batch(self, frames):
+        """One forward pass over several frames; one result per frame.
+
+        ONNX/OpenVINO models exported without dynamic=True (and the INT8 model) take a batch of one
+        only: the first batch they reject is retried frame by frame, and so is every batch after it.
+        """
+        frames = list(frames)
+        if len(frames) == 1 or self._batching is False:
+            return [self.predict(frame) for frame in frames]
+        try:
+            with self._lock:
+                started = time.perf_counter()
+                results = self.model(frames, imgsz=self.imgsz, verbose=False)
+        except Exception as e:
+            if self._batching:
+                raise
+            self._batching = False
+            print(f"[DETECTOR] {self.path} cannot run a batch ({e}); detecting frame by frame. "
+                  f"Re-export it with dynamic=True to batch")
+            return [self.predict(frame) for frame in frames]
+        self._batching = True
+        metrics.detector_inference_seconds.observe(time.perf_counter() - started, backend=self.backend)
+        return results
+
+    def detect(self, frame):
+        return self._items(self.predict(frame))
+
+    def detect_batch(self, frames):
+        return [self._items(results) for results in self.predict_batch(frames)]
+
+    def _items(self, results):
+        items = [results.names[int(cls)] for cls in results.boxes.cls.tolist()]
+        for item in items:
+            metrics.detections.inc(cls=item)
+        return items
+
+    def warm_up(self, runs=1):
+        """Dummy inference so graph setup and allocation happen before the first real frame"""
+        dummy = np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8)
+        for _ in range(runs):
+            self.predict(dummy)
+
+
+def load_detector(weights, backend="torch", imgsz=640, export=True, batch=1):
+    """Load the configured runtime, exporting on first use; any failure falls back to PyTorch.
+
+    With batch > 1 (micro-batching on) a first-use export gets a dynamic batch dimension.
+    """
+    # Imported here so torch/ultralytics are only paid for when the detector is actually loaded
+    from ultralytics import YOLO
+
+    if backend not in BACKENDS:
+        print(f"[DETECTOR] Unknown backend {backend!r}, using torch")
+        backend = "torch"
+
+    if backend != "torch":
+        try:
+            path = exported_path(weights, backend)
+            if not os.path.exists(path):
+                if not export or backend == "int8":
+                    raise FileNotFoundError(path)
+                path = export_weights(weights, backend, imgsz=imgsz, dynamic=batch > 1)
+            detector = Detector(YOLO(path, task="detect"), backend, path, imgsz)
+            print(f"[DETECTOR] Using {backend} model {path}")
+            return detector
+        except Exception as e:
+            print(f"[DETECTOR] {backend} backend unavailable ({e}), falling back to torch")
+
+    detector = Detector(YOLO(weights), "torch", weights, imgsz)
+    print(f"[DETECTOR] Using torch model {weights}")
+    return detector
+
+
+if __name__ == "__main__":
+    # Pre-export on a build box: python detectors.py onnx [weights.pt]
+    import config
+
+    target = sys.argv[1] if len(sys.argv) > 1 else "onnx"
+    source = sys.argv[2] if len(sys.argv) > 2 else config.MODEL_PATH
+    print(export_weights(source, target, imgsz=config.DETECTOR_IMGSZ, dynamic=config.DETECT_MAX_BATCH > 1))
@@ -0,0 +1,277 @@
+import threading
+import time
+
+import cv2
+
+import metrics
+
+# Requested widths snap up to one of these, so a handful of tiers serve every client
+TIER_WIDTHS = (160, 240, 320, 480, 640, 960, 1280, 1920)
+MAX_TIER_FPS = 30
+
+
+class TooManyTiers(RuntimeError):
+    pass
+
+
+def normalize_tier(width=None, fps=None, quality=80):
+    """(width, fps, quality) snapped to the shared steps; None width/fps mean native size / every frame"""
+    if width is not None:
+        width = next((w for w in TIER_WIDTHS if w >= width), None)
+    if fps is not None:
+        fps = min(MAX_TIER_FPS, max(1, int(round(fps))))
+        if fps == MAX_TIER_FPS:
+            fps = None
+    quality = min(95, max(20, int(round(quality / 5.0)) * 5))
+    return width, fps, quality
+
+
+def tier_name(tier):
+    width, fps, quality = tier
+    return f"{width or 'full'}w_{fps or 'max'}fps_q{quality}"
+
+
+def _encode(frame, width, quality):
+    """JPEG buffer of frame, downscaled to width first if it is narrower; None if encoding failed"""
+    if width and width < frame.shape[1]:
+        height = max(1, round(frame.shape[0] * width / frame.shape[1]))
+        frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+    ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer if ret else None
+
+
+# --- One encoded stream tier ---
+class _Tier:
+    """Downscales and encodes each new ring frame once for every client that asked for this tier"""
+
+    def __init__(self, broadcaster, key):
+        self.broadcaster = broadcaster
+        self.key = key
+        self.width, self.fps, self.quality = key
+        self.name = tier_name(key)
+        self.subscribers = 0  # guarded by the broadcaster's lock
+        self.idle_since = time.time()
+        self.frames_encoded = 0
+        self._cond = threading.Condition()
+        self._jpeg = None
+        self._seq = 0
+        self._running = True
+        self._thread = threading.Thread(target=self._encode_loop, name=f"encode-{self.name}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def _encode_loop(self):
+        broadcaster = self.broadcaster
+        encoded_seq = 0
+        last_encode = 0.0
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+            if broadcaster._retire_if_idle(self):
+                return
+
+            if self.fps:
+                # Pace to the tier's rate; frames in between are simply never encoded
+                wait = last_encode + 1.0 / self.fps - time.time()
+                if wait > 0:
+                    with self._cond:
+                        self._cond.wait(wait)
+                    continue
+
+            view = broadcaster.ring.wait_for(encoded_seq, timeout=0.5)
+            if view is None:
+                continue
+            with view:
+                encoded_seq = view.seq
+                started = time.perf_counter()
+                buffer = _encode(view.frame, self.width, self.quality)
+            last_encode = time.time()
+            if buffer is None:
+                continue
+            labels = {"camera": broadcaster.name, "tier": self.name}
+            metrics.stream_encode_seconds.observe(time.perf_counter() - started, **labels)
+            metrics.stream_encoded_bytes.inc(buffer.size, **labels)
+            metrics.stream_frames_encoded.inc(**labels)
+
+            with self._cond:
+                self._jpeg = buffer.tobytes()
+                self._seq = encoded_seq
+                self.frames_encoded += 1
+                self._cond.notify_all()
+
+    def wait_for_frame(self, after_seq=0, timeout=None):
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > after_seq or not self._running, timeout)
+            if self._seq > after_seq:
+                return self._seq, self._jpeg
+            return after_seq, None
+
+    def encoded(self, seq):
+        """This tier's buffer if it holds exactly frame seq, else None"""
+        with self._cond:
+            return self._jpeg if self._seq == seq else None
+
+
+# --- Encode-once MJPEG broadcaster ---
+class FrameBroadcaster:
+    """Serves a ring as MJPEG in quality tiers; each tier is encoded once per frame for all its clients.
+
+    A tier's encoder thread starts with its first client and is torn down after idle_timeout seconds
+    without any. At most max_tiers run at once (TooManyTiers beyond that).
+    """
+
+    def __init__(self, ring, quality=80, name="main", max_tiers=6, idle_timeout=10.0):
+        self.ring = ring
+        self.quality = quality
+        self.name = name
+        self.max_tiers = max_tiers
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._tiers = {}
+        self._running = False
+        # Single-frame JPEGs (/video-frame), one per (width, quality), each for its newest seq
+        self._still_lock = threading.Lock()
+        self._stills = {}
+
+    def start(self):
+        with self._lock:
+            self._running = True
+
+    def stop(self):
+        with self._lock:
+            self._running = False
+            tiers, self._tiers = list(self._tiers.values()), {}
+        for tier in tiers:
+            tier.stop()
+        with self._still_lock:
+            self._stills = {}
+
+    def _acquire(self, key):
+        with self._lock:
+            if not self._running:
+                return None
+            tier = self._tiers.get(key)
+            if tier is None:
+                if len(self._tiers) >= self.max_tiers:
+                    raise TooManyTiers(f"Camera {self.name} is already streaming {self.max_tiers} tiers")
+                tier = self._tiers[key] = _Tier(self, key)
+                tier.start()
+                print(f"[STREAM] {self.name}: started tier {tier.name}")
+            tier.subscribers += 1
+            return tier
+
+    def _release(self, tier):
+        with self._lock:
+            tier.subscribers -= 1
+            if tier.subscribers == 0:
+                tier.idle_since = time.time()
+
+    def _retire_if_idle(self, tier):
+        """Called by a tier's own thread: drop it once nobody has watched it for idle_timeout"""
+        with self._lock:
+            if tier.subscribers > 0 or time.time() - tier.idle_since < self.idle_timeout:
+                return False
+            if self._tiers.get(tier.key) is tier:
+                del self._tiers[tier.key]
+        tier.stop()
+        print(f"[STREAM] {self.name}: tier {tier.name} idle, stopped")
+        return True
+
+    def stream(self, width=None, fps=None, quality=None):
+        """MJPEG iterable for a tier; a slow client just skips to the newest frame instead of queueing.
+
+        The client is counted from this call until the iterable is closed (WSGI servers close it when
+        the connection ends), and TooManyTiers is raised here so the route can still answer with an error.
+        """
+        return _Subscription(self, self._acquire(self._tier_key(width, fps, quality)))
+
+    def _tier_key(self, width, fps, quality):
+        shape = self.ring.shape
+        if width is not None and shape is not None and width >= shape[1]:
+            width = None  # no upscaling: that is the native tier
+        return normalize_tier(width, fps, self.quality if quality is None else quality)
+
+    def latest_jpeg(self, after_seq=0, timeout=0.0, width=None, quality=None):
+        """(seq, jpeg) of the newest frame after after_seq, waiting up to timeout for one.
+
+        Returns (latest_seq, None) if no newer frame came. A frame is encoded at most once per size and
+        quality: the buffer of a stream tier that already holds it is reused, and so is the last still.
+        """
+        key = self._tier_key(width, None, quality)
+        view = self.ring.wait_for(after_seq, timeout=timeout)
+        if view is None:
+            return self.ring.latest_seq, None
+        with view:
+            seq = view.seq
+            with self._lock:
+                tier = self._tiers.get(key)
+            jpeg = tier.encoded(seq) if tier is not None else None
+            if jpeg is not None:
+                return seq, jpeg
+            # Pollers woken by the same frame wait here for the first one's encode instead of repeating it
+            with self._still_lock:
+                still = self._stills.get(key)
+                if still is not None and still[0] >= seq:
+                    return still
+                started = time.perf_counter()
+                buffer = _encode(view.frame, key[0], key[2])
+                if buffer is None:
+                    return seq, None
+                labels = {"camera": self.name, "tier": f"still_{key[0] or 'full'}w_q{key[2]}"}
+                metrics.stream_encode_seconds.observe(time.perf_counter() - started, **labels)
+                metrics.stream_encoded_bytes.inc(buffer.size, **labels)
+                metrics.stream_frames_encoded.inc(**labels)
+                self._stills[key] = (seq, buffer.tobytes())
+                return self._stills[key]
+
+    def _frames(self, tier):
+        last_seq = 0
+        while self._running:
+            seq, jpeg = tier.wait_for_frame(last_seq, timeout=1.0)
+            if jpeg is None:
+                continue
+            last_seq = seq
+            yield (b'--frame\r\n'
+                   b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+
+    @property
+    def subscribers(self):
+        with self._lock:
+            return sum(tier.subscribers for tier in self._tiers.values())
+
+    def tiers(self):
+        with self._lock:
+            return {tier.name: {"subscribers": tier.subscribers, "frames_encoded": tier.frames_encoded}
+                    for tier in self._tiers.values()}
+
+
+class _Subscription:
+    """One client's MJPEG stream; closing it (or running out) releases its place on the tier"""
+
+    def __init__(self, broadcaster, tier):
+        self._broadcaster = broadcaster
+        self._tier = tier
+        self._frames = broadcaster._frames(tier) if tier is not None else iter(())
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._frames)
+        except StopIteration:
+            self.close()
+            raise
+
+    def close(self):
+        if self._tier is not None:
+            tier, self._tier = self._tier, None
+            self._frames.close()
+            self._broadcaster._release(tier)
@@ -0,0 +1,320 @@
+import threading
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+import metrics
+
+
+# --- Frame ring buffer ---
+class FrameView:
+    """Read-only view of one ring slot; the slot is not overwritten until release() is called"""
+
+    def __init__(self, ring, slot, seq, timestamp, frame):
+        self._ring = ring
+        self.slot = slot
+        self.seq = seq
+        self.timestamp = timestamp
+        self.frame = frame
+
+    def release(self):
+        if self._ring is not None:
+            self._ring._unpin(self.slot)
+            self._ring = None
+
+    def copy(self):
+        metrics.frame_copy_bytes.inc(self.frame.nbytes, site="view_copy")
+        return self.frame.copy()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def __del__(self):
+        self.release()
+
+
+def _shared_layout(capacity, shape, dtype):
+    """Byte offsets of the seq / timestamp / pixel arrays inside one shared memory block"""
+    frame_bytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    seqs = 0
+    timestamps = seqs + 8 * capacity
+    frames = timestamps + 8 * capacity
+    return seqs, timestamps, frames, frames + frame_bytes * capacity
+
+
+class FrameRing:
+    """Preallocated ring of the last N camera frames with sequence numbers and timestamps.
+
+    With shared=True the slots (and their seq/timestamp arrays) live in one multiprocessing
+    shared memory block: other processes attach with SharedFrameReader(ring.descriptor()) and read
+    the same pixels without pickling. Pinning stays in this process, so whoever hands a slot to
+    a worker keeps its FrameView until the worker is done with it.
+    """
+
+    def __init__(self, capacity=8, shared=False):
+        self.capacity = capacity
+        self.shared = shared
+        self._cond = threading.Condition()
+        self._shm = None
+        self._frames = None
+        self._seqs = np.zeros(capacity, dtype=np.int64)
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._pins = [0] * capacity
+        self._next_slot = 0
+        self._latest_slot = -1
+        self._seq = 0
+        self.dropped = 0
+
+    def allocate(self, shape, dtype=np.uint8):
+        with self._cond:
+            shape = tuple(shape)
+            if self.shared:
+                seqs, timestamps, frames, size = _shared_layout(self.capacity, shape, dtype)
+                self._release_shared()
+                self._shm = shared_memory.SharedMemory(create=True, size=size)
+                buf = self._shm.buf
+                self._seqs = np.ndarray((self.capacity,), np.int64, buf, seqs)
+                self._timestamps = np.ndarray((self.capacity,), np.float64, buf, timestamps)
+                self._frames = np.ndarray((self.capacity,) + shape, dtype, buf, frames)
+                self._timestamps[:] = 0
+                print(f"[CAMERA] Frame ring in shared memory {self._shm.name} ({size / 1e6:.1f} MB)")
+            else:
+                self._frames = np.empty((self.capacity,) + shape, dtype=dtype)
+            metrics.frame_allocations.inc(site="ring")
+            metrics.frame_alloc_bytes.inc(self._frames.nbytes, site="ring")
+            self._seqs[:] = 0
+            self._latest_slot = -1
+
+    def descriptor(self):
+        """Picklable description a worker process passes to SharedFrameReader; None if not shared"""
+        with self._cond:
+            if self._shm is None:
+                return None
+            return {"name": self._shm.name, "capacity": self.capacity,
+                    "shape": self._frames.shape[1:], "dtype": self._frames.dtype.str}
+
+    def close(self):
+        with self._cond:
+            self._release_shared()
+
+    def _release_shared(self):
+        if self._shm is None:
+            return
+        shm, self._shm = self._shm, None
+        # Swap in private arrays first: the views into the block must be gone before it can close
+        self._seqs = np.zeros(self.capacity, dtype=np.int64)
+        self._timestamps = np.zeros(self.capacity, dtype=np.float64)
+        self._frames = None
+        self._latest_slot = -1
+        shm.unlink()
+        try:
+            shm.close()
+        except BufferError:
+            pass  # a reader still holds a FrameView; the mapping goes away with it
+
+    @property
+    def shape(self):
+        return None if self._frames is None else self._frames.shape[1:]
+
+    @property
+    def latest_seq(self):
+        with self._cond:
+            return self._seq
+
+    # Writer side (capture thread only)
+    def claim(self):
+        """Pick the next slot nobody is reading; returns (slot, buffer) or (None, None) if all are pinned"""
+        with self._cond:
+            for _ in range(self.capacity):
+                slot = self._next_slot
+                self._next_slot = (self._next_slot + 1) % self.capacity
+                if self._pins[slot] == 0 and slot != self._latest_slot:
+                    self._seqs[slot] = -1
+                    return slot, self._frames[slot]
+            self.dropped += 1
+            return None, None
+
+    def commit(self, slot, timestamp):
+        with self._cond:
+            self._seq += 1
+            self._seqs[slot] = self._seq
+            self._timestamps[slot] = timestamp
+            self._latest_slot = slot
+            self._cond.notify_all()
+            return self._seq
+
+    # Reader side
+    def _view(self, slot):
+        self._pins[slot] += 1
+        frame = self._frames[slot].view()
+        frame.flags.writeable = False
+        return FrameView(self, slot, int(self._seqs[slot]), float(self._timestamps[slot]), frame)
+
+    def _unpin(self, slot):
+        with self._cond:
+            self._pins[slot] -= 1
+
+    def latest(self):
+        """Pinned read-only view of the newest frame, or None before the first frame"""
+        with self._cond:
+            if self._latest_slot < 0:
+                return None
+            return self._view(self._latest_slot)
+
+    def get(self, seq):
+        """Pinned view of a specific frame if it is still in the ring"""
+        with self._cond:
+            for slot in range(self.capacity):
+                if self._seqs[slot] == seq:
+                    return self._view(slot)
+            return None
+
+    def locate(self, frame):
+        """(slot, seq) if `frame` is a whole slot of this shared ring (e.g. a FrameView's frame), else None"""
+        with self._cond:
+            frames = self._frames
+            if self._shm is None or frames is None or frame.shape != frames.shape[1:] or frame.dtype != frames.dtype:
+                return None
+            offset = frame.__array_interface__["data"][0] - frames.__array_interface__["data"][0]
+            slot_bytes = frames[0].nbytes
+            if offset < 0 or offset % slot_bytes or offset // slot_bytes >= self.capacity:
+                return None
+            if not frame.flags.c_contiguous:
+                return None
+            slot = offset // slot_bytes
+            return slot, int(self._seqs[slot])
+
+    def wait_for(self, after_seq=0, timeout=None):
+        """Block until a frame newer than after_seq exists and return a pinned view of it"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > after_seq, timeout)
+            if self._seq <= after_seq or self._latest_slot < 0:
+                return None
+            return self._view(self._latest_slot)
+
+
+# --- Worker-process side ---
+class SharedFrameReader:
+    """Attaches to a shared FrameRing from another process; frames are read-only views, never copies"""
+
+    def __init__(self, descriptor):
+        self.descriptor = descriptor
+        # Only attach: the creating process owns the block and unlinks it in FrameRing.close()
+        self._shm = shared_memory.SharedMemory(name=descriptor["name"])
+        capacity, shape, dtype = descriptor["capacity"], tuple(descriptor["shape"]), np.dtype(descriptor["dtype"])
+        seqs, timestamps, frames, _ = _shared_layout(capacity, shape, dtype)
+        buf = self._shm.buf
+        self._seqs = np.ndarray((capacity,), np.int64, buf, seqs)
+        self._timestamps = np.ndarray((capacity,), np.float64, buf, timestamps)
+        self._frames = np.ndarray((capacity,) + shape, dtype, buf, frames)
+        self._frames.flags.writeable = False
+
+    def read(self, slot, seq):
+        """(frame, timestamp) for `slot` if it still holds frame `seq`, else (None, None)"""
+        if self._seqs[slot] != seq:
+            return None, None
+        return self._frames[slot], float(self._timestamps[slot])
+
+    def still_valid(self, slot, seq):
+        """True if the slot was not rewritten while it was being read"""
+        return self._seqs[slot] == seq
+
+    def close(self):
+        self._seqs = self._timestamps = self._frames = None
+        self._shm.close()
+
+
+# --- Capture thread ---
+class CameraCapture:
+    """Owns a FrameSource and reads its frames into a FrameRing at the source's native rate"""
+
+    def __init__(self, source, capacity=8, shared=False):
+        self.source = source
+        self.ring = FrameRing(capacity, shared=shared)
+        self.frames_read = 0
+        self.read_failures = 0
+        self.fps = 0.0
+        self._last_commit = None
+        self._opened = False
+        self._scratch = None
+        self._running = False
+        self._close_ring_on_exit = False
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return
+        self.source.open()
+        self._opened = True
+        self._close_ring_on_exit = False
+        self._running = True
+        self._thread = threading.Thread(target=self._read_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        if self._opened:
+            self.source.release()
+            self._opened = False
+        # The ring must outlive its writer: a thread still stuck in source.read() closes it on the way out
+        self._close_ring_on_exit = True
+        if self._thread is None or not self._thread.is_alive():
+            self.ring.close()
+        else:
+            print(f"[CAMERA] {self.source.name}: reader still busy, frame ring closes when it exits")
+
+    def _read_loop(self):
+        try:
+            self._read_frames()
+        finally:
+            if self._close_ring_on_exit:
+                self.ring.close()
+
+    def _read_frames(self):
+        while self._running:
+            if self.ring.shape is None:
+                ret, frame = self.source.read()
+                if not ret:
+                    self._read_failed()
+                    continue
+                self.ring.allocate(frame.shape)
+                self._scratch = np.empty_like(frame)
+                metrics.frame_allocations.inc(site="capture_scratch")
+                metrics.frame_alloc_bytes.inc(self._scratch.nbytes, site="capture_scratch")
+
+            slot, buffer = self.ring.claim()
+            if slot is None:
+                # Every slot is held by a reader: keep draining the camera, drop the frame
+                self.source.read(self._scratch)
+                continue
+
+            ret, frame = self.source.read(buffer)
+            if not ret:
+                self._read_failed()
+                continue
+            if frame is not buffer:
+                # The source could not decode in place: one extra copy into the ring slot
+                if frame.shape != buffer.shape:
+                    frame = cv2.resize(frame, (buffer.shape[1], buffer.shape[0]))
+                buffer[...] = frame
+                metrics.frame_copy_bytes.inc(buffer.nbytes, site="capture")
+
+            now = time.time()
+            self.ring.commit(slot, now)
+            self.frames_read += 1
+            if self._last_commit is not None and now > self._last_commit:
+                # Smoothed read rate, cheap enough to update on every frame
+                rate = 1.0 / (now - self._last_commit)
+                self.fps = 0.9 * self.fps + 0.1 * rate if self.fps else rate
+            self._last_commit = now
+
+    def _read_failed(self):
+        self.read_failures += 1
+        time.sleep(0.05)
@@ -0,0 +1,194 @@
+import glob
+import os
+import time
+
+import cv2
+
+import metrics
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+# --- Frame sources ---
+# Everything that produces frames (USB camera, video file, image folder, network stream) behind the
+# same open()/read()/release() calls, so capture, detection and streaming never know which one it is.
+class FrameSource:
+    name = "source"
+    fps = 0.0
+
+    def open(self):
+        raise NotImplementedError
+
+    def read(self, out=None):
+        """Return (ok, frame); when `out` has the right shape the frame is written into it"""
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.name}>"
+
+
+class _CaptureSource(FrameSource):
+    """Shared cv2.VideoCapture plumbing"""
+
+    def __init__(self, target):
+        self.target = target
+        self.name = str(target)
+        self._cap = None
+
+    def _open_capture(self):
+        self._cap = cv2.VideoCapture(self.target)
+        if not self._cap.isOpened():
+            raise RuntimeError(f"Cannot open {self.name}")
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS) or 0.0
+
+    def read(self, out=None):
+        return self._cap.read(out)
+
+    def release(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+
+class DeviceSource(_CaptureSource):
+    """USB/CSI camera by device index; reads block at the camera's native rate"""
+
+    def __init__(self, index, width=1280, height=720):
+        super().__init__(index)
+        self.name = f"device:{index}"
+        self.width = width
+        self.height = height
+
+    def open(self):
+        self._open_capture()
+        self._cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        self._cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+
+
+class StreamSource(_CaptureSource):
+    """RTSP/HTTP stream; reconnects when the stream drops"""
+
+    def __init__(self, url, reconnect_delay=1.0):
+        super().__init__(url)
+        self.reconnect_delay = reconnect_delay
+
+    def open(self):
+        self._open_capture()
+
+    def read(self, out=None):
+        if self._cap is None:
+            # A previous reconnect failed: keep retrying at the reconnect pace
+            time.sleep(self.reconnect_delay)
+            try:
+                self._open_capture()
+            except RuntimeError:
+                self._cap = None
+            return False, None
+        ret, frame = self._cap.read(out)
+        if not ret:
+            self.release()
+        return ret, frame
+
+
+class _Pacer:
+    """Sleeps so frames come out at `fps` (real time); fps <= 0 means as fast as possible"""
+
+    def __init__(self, fps):
+        self.interval = 1.0 / fps if fps and fps > 0 else 0.0
+        self._next = None
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.perf_counter()
+        if self._next is None or now - self._next > self.interval:
+            self._next = now
+        elif self._next > now:
+            time.sleep(self._next - now)
+        self._next += self.interval
+
+
+class VideoFileSource(_CaptureSource):
+    """Video file, played at its own frame rate or as fast as possible; loops by default"""
+
+    def __init__(self, path, realtime=True, loop=True):
+        super().__init__(path)
+        self.name = f"file:{path}"
+        self.realtime = realtime
+        self.loop = loop
+        self._pacer = None
+
+    def open(self):
+        self._open_capture()
+        self._pacer = _Pacer(self.fps if self.realtime else 0)
+
+    def read(self, out=None):
+        self._pacer.wait()
+        ret, frame = self._cap.read(out)
+        if not ret and self.loop:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self._cap.read(out)
+        return ret, frame
+
+
+class ImageDirSource(FrameSource):
+    """Folder of images played in name order; preloaded so disk speed doesn't skew throughput runs"""
+
+    def __init__(self, folder, fps=10.0, realtime=True, loop=True, preload=True):
+        self.folder = folder
+        self.name = f"images:{folder}"
+        self.fps = fps
+        self.realtime = realtime
+        self.loop = loop
+        self.preload = preload
+        self._paths = []
+        self._frames = None
+        self._index = 0
+        self._pacer = None
+
+    def open(self):
+        self._paths = sorted(
+            p for p in glob.glob(os.path.join(self.folder, "*")) if p.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        if not self._paths:
+            raise RuntimeError(f"No images in {self.folder}")
+        self._frames = [cv2.imread(p) for p in self._paths] if self.preload else None
+        self._index = 0
+        self._pacer = _Pacer(self.fps if self.realtime else 0)
+
+    def read(self, out=None):
+        if self._index >= len(self._paths):
+            if not self.loop:
+                return False, None
+            self._index = 0
+        frame = self._frames[self._index] if self._frames is not None else cv2.imread(self._paths[self._index])
+        self._index += 1
+        self._pacer.wait()
+        if frame is None:
+            return False, None
+        if out is not None and out.shape == frame.shape:
+            out[...] = frame
+            metrics.frame_copy_bytes.inc(frame.nbytes, site="source_cache")
+            return True, out
+        if self._frames is None:
+            return True, frame
+        metrics.frame_copy_bytes.inc(frame.nbytes, site="source_cache")
+        return True, frame.copy()
+
+    def release(self):
+        self._frames = None
+
+
+def open_source(spec, width=1280, height=720, realtime=True, fps=10.0, loop=True):
+    """Build a FrameSource from a config string: "2", "rtsp://...", "path/to/video.mp4" or "path/to/frames/" """
+    spec = str(spec).strip()
+    if spec.isdigit():
+        return DeviceSource(int(spec), width, height)
+    if "://" in spec:
+        return StreamSource(spec)
+    if os.path.isdir(spec):
+        return ImageDirSource(spec, fps=fps, realtime=realtime, loop=loop)
+    return VideoFileSource(spec, realtime=realtime, loop=loop)
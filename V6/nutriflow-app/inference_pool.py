@@ -0,0 +1,352 @@
+import multiprocessing
+import queue
+import threading
+import time
+
+import metrics
+from frame_capture import SharedFrameReader
+
+
+class InferenceError(RuntimeError):
+    pass
+
+
+class InferenceBusy(InferenceError):
+    """Every worker is busy and the pending queue is full"""
+
+
+class InferenceTimeout(InferenceError):
+    pass
+
+
+class WorkerCrashed(InferenceError):
+    pass
+
+
+# --- Worker process ---
+def _worker_main(conn, weights, backend, imgsz, warmup_runs, batch):
+    """Load the model once, then answer ("detect", task_id, payloads) messages until told to stop"""
+    from detectors import load_detector
+
+    detector = load_detector(weights, backend, imgsz=imgsz, batch=batch)
+    detector.warm_up(warmup_runs)
+    conn.send(("ready", dict(detector.names), detector.backend, detector.path))
+
+    readers = {}
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if message[0] == "stop":
+            return
+        _, task_id, payloads = message
+        try:
+            frames = []
+            for payload in payloads:
+                if payload[0] == "shm":
+                    # A slot of the camera's shared ring: the parent holds its pin until we answer
+                    _, descriptor, slot, seq = payload
+                    reader = readers.get(descriptor["name"])
+                    if reader is None:
+                        reader = readers[descriptor["name"]] = SharedFrameReader(descriptor)
+                    frame, _ = reader.read(slot, seq)
+                    if frame is None:
+                        raise InferenceError(f"Frame {seq} is no longer in the ring")
+                else:
+                    frame = payload[1]
+                frames.append(frame)
+            started = time.perf_counter()
+            # predict_batch falls back to one frame at a time for static-shape exports
+            batch = detector.predict_batch(frames)
+            elapsed = time.perf_counter() - started
+            conn.send(("ok", task_id, [(results.boxes.cls.tolist(), results.boxes.xyxy.tolist(),
+                                        results.boxes.conf.tolist()) for results in batch], elapsed))
+        except Exception as e:
+            conn.send(("error", task_id, f"{type(e).__name__}: {e}"))
+
+
+# --- Pool (parent side) ---
+class _Task:
+    def __init__(self, payload, deadline):
+        self.id = None
+        self.payload = payload
+        self.deadline = deadline
+        self.submitted = time.time()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def resolve(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.done.set()
+
+
+class _Worker:
+    """One worker process plus the parent thread that feeds it one task at a time"""
+
+    def __init__(self, pool, index):
+        self.pool = pool
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.busy = False
+        self.restarts = 0
+
+    def spawn(self):
+        pool = self.pool
+        parent_conn, child_conn = pool._ctx.Pipe()
+        self.process = pool._ctx.Process(
+            target=_worker_main, name=f"inference-{self.index}", daemon=True,
+            args=(child_conn, pool.weights, pool.requested_backend, pool.imgsz, pool.warmup_runs, pool.batch))
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        if not parent_conn.poll(pool.load_timeout):
+            self.kill()
+            raise InferenceError(f"Inference worker {self.index} did not load within {pool.load_timeout}s")
+        try:
+            _, names, backend, path = parent_conn.recv()
+        except EOFError:
+            self.kill()
+            raise WorkerCrashed(f"Inference worker {self.index} exited while loading the model")
+        pool._loaded(names, backend, path)
+        print(f"[INFERENCE] Worker {self.index} ready (pid {self.process.pid}, {backend})")
+
+    def kill(self):
+        if self.process is not None and self.process.is_alive():
+            self.process.kill()
+        if self.process is not None:
+            self.process.join(timeout=5)
+        if self.conn is not None:
+            self.conn.close()
+        self.process = self.conn = None
+
+    def restart(self, reason):
+        print(f"[INFERENCE] Restarting worker {self.index}: {reason}")
+        self.kill()
+        self.restarts += 1
+        metrics.inference_worker_restarts.inc()
+        while self.pool._running:
+            try:
+                self.spawn()
+                return
+            except InferenceError as e:
+                print(f"[INFERENCE] Worker {self.index} failed to restart ({e}), retrying")
+                time.sleep(1.0)
+
+    def stop(self):
+        if self.conn is not None:
+            try:
+                self.conn.send(("stop",))
+            except (OSError, ValueError):
+                pass
+        if self.process is not None:
+            self.process.join(timeout=2)
+        self.kill()
+
+    def serve(self):
+        pool = self.pool
+        while True:
+            task = pool._queue.get()
+            if task is None:
+                return
+            remaining = task.deadline - time.time()
+            if remaining <= 0:
+                # Waited out its whole budget in the queue; the caller has already given up
+                pool._finish(task, error=InferenceTimeout("Inference timed out waiting for a worker"))
+                continue
+            if self.process is None or not self.process.is_alive():
+                self.restart("process is not running")
+                # A model load can take longer than a task's whole budget; that is the task's loss only
+                if self.process is None:
+                    pool._finish(task, error=InferenceError("Inference pool is stopping"))
+                    continue
+                if task.deadline <= time.time():
+                    pool._finish(task, error=InferenceTimeout("Inference timed out while its worker restarted"))
+                    continue
+            self.busy = True
+            try:
+                self._run(task)
+            finally:
+                self.busy = False
+
+    def _run(self, task):
+        pool = self.pool
+        try:
+            sent = time.time()
+            self.conn.send(("detect", task.id, task.payload))
+            if not self.conn.poll(max(0.0, task.deadline - sent)):
+                pool._finish(task, error=InferenceTimeout(f"Inference took longer than {pool.timeout}s"))
+                # Part of the task's budget may have gone on queueing, so the worker itself gets a full
+                # timeout before it counts as wedged. A wedged worker cannot be interrupted, only replaced
+                if not self.conn.poll(max(0.0, sent + pool.timeout - time.time())):
+                    self.restart("task timed out")
+                else:
+                    self.conn.recv()  # late answer; nobody is waiting for it any more
+                return
+            message = self.conn.recv()
+        except (EOFError, OSError) as e:
+            if not task.done.is_set():
+                pool._finish(task, error=WorkerCrashed(f"Inference worker {self.index} crashed"))
+            self.restart(f"crashed ({type(e).__name__})")
+            return
+
+        if message[0] == "ok":
+            _, _, batch, elapsed = message
+            metrics.detector_inference_seconds.observe(elapsed, backend=pool.backend)
+            pool._finish(task, result=[{"cls": [int(c) for c in cls], "boxes": boxes, "conf": conf}
+                                       for cls, boxes, conf in batch])
+        else:
+            pool._finish(task, error=InferenceError(message[2]))
+
+
+class InferencePool:
+    """YOLO in worker processes, so inference neither holds the GIL nor blocks Flask or the encoder.
+
+    Has the Detector interface (detect/backend/path/names). Frames that sit in one of the cameras'
+    shared rings are sent as (slot, seq) and read in place; anything else is pickled. At most max_pending
+    tasks wait for a worker (InferenceBusy beyond that); each task gets `timeout` seconds end to end,
+    and a worker that crashes or overruns is killed and respawned.
+    """
+
+    def __init__(self, weights, backend="torch", imgsz=640, workers=2, max_pending=8, timeout=10.0,
+                 warmup_runs=1, rings=(), load_timeout=300.0, batch=1):
+        self.weights = weights
+        self.requested_backend = backend
+        self.imgsz = imgsz
+        self.batch = batch  # largest batch the workers will be sent (decides how the model is exported)
+        self.warmup_runs = warmup_runs
+        self.timeout = timeout
+        self.load_timeout = load_timeout
+        self.rings = list(rings)
+        self.backend = backend
+        self.path = weights
+        self.names = {}
+        # Forking a process that has threads (and maybe torch) loaded is unsafe; start workers clean
+        self._ctx = multiprocessing.get_context("spawn")
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._workers = [_Worker(self, index) for index in range(workers)]
+        self._threads = []
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._running = False
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def start(self):
+        """Spawn every worker and wait until each has loaded and warmed up the model"""
+        self._running = True
+        threads = [threading.Thread(target=self._spawn, args=(worker,)) for worker in self._workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if not any(worker.process is not None for worker in self._workers):
+            self._running = False
+            raise InferenceError("No inference worker could be started")
+        for worker in self._workers:
+            thread = threading.Thread(target=worker.serve, name=f"inference-feed-{worker.index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def _spawn(self, worker):
+        try:
+            worker.spawn()
+        except InferenceError as e:
+            # The serve loop retries it on its first task
+            print(f"[INFERENCE] {e}")
+
+    def stop(self):
+        self._running = False
+        for _ in self._workers:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+        for worker in self._workers:
+            worker.stop()
+
+    def _loaded(self, names, backend, path):
+        with self._lock:
+            self.names, self.backend, self.path = names, backend, path
+
+    def _finish(self, task, result=None, error=None):
+        with self._lock:
+            if error is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+        metrics.inference_tasks.inc(outcome="ok" if error is None else type(error).__name__)
+        task.resolve(result, error)
+
+    def _payload(self, frame):
+        for ring in self.rings:
+            located = ring.locate(frame)
+            if located is not None:
+                return ("shm", ring.descriptor(), located[0], located[1])
+        metrics.frame_copy_bytes.inc(frame.nbytes, site="inference_pickle")
+        return ("array", frame)
+
+    def infer(self, frame):
+        """{"cls": [...], "boxes": [[x1, y1, x2, y2], ...], "conf": [...]} for one frame.
+
+        A ring frame must stay pinned (inside its FrameView) until this returns.
+        """
+        return self.infer_batch([frame])[0]
+
+    def infer_batch(self, frames):
+        """infer() for several frames as one task, run by one worker in a single forward pass"""
+        if not self._running:
+            raise InferenceError("Inference pool is not running")
+        task = _Task([self._payload(frame) for frame in frames], time.time() + self.timeout)
+        with self._lock:
+            self._next_id += 1
+            task.id = self._next_id
+        try:
+            self._queue.put_nowait(task)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            metrics.inference_tasks.inc(outcome="rejected")
+            raise InferenceBusy("Inference queue is full, try again shortly")
+        if not task.done.wait(self.timeout + 5.0):
+            raise InferenceTimeout(f"Inference took longer than {self.timeout}s")
+        if task.error is not None:
+            raise task.error
+        return task.result
+
+    def detect(self, frame):
+        return self._items(self.infer(frame))
+
+    def detect_batch(self, frames):
+        return [self._items(result) for result in self.infer_batch(frames)]
+
+    def _items(self, result):
+        items = [self.names.get(cls, str(cls)) for cls in result["cls"]]
+        for item in items:
+            metrics.detections.inc(cls=item)
+        return items
+
+    def warm_up(self, runs=1):
+        """Workers warm themselves up when they start"""
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": len(self._workers),
+                "alive": sum(1 for w in self._workers if w.process is not None and w.process.is_alive()),
+                "busy": sum(1 for w in self._workers if w.busy),
+                "pending": self._queue.qsize(),
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "restarts": sum(w.restarts for w in self._workers),
+            }
@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import Counter, deque
+
+
+def majority_vote(history):
+    """Per class, the count seen most often over the window; ties go to the value closest to the latest"""
+    latest = history[-1]
+    classes = set()
+    for counts in history:
+        classes.update(counts)
+
+    smoothed = Counter()
+    for cls in classes:
+        votes = Counter(counts.get(cls, 0) for counts in history)
+        best = max(votes.values())
+        candidates = [value for value, n in votes.items() if n == best]
+        value = min(candidates, key=lambda v: (abs(v - latest.get(cls, 0)), -v))
+        if value > 0:
+            smoothed[cls] = value
+    return smoothed
+
+
+# --- Background inventory ---
+class InventoryTracker:
+    """Runs the detector on the capture stream in the background and keeps a smoothed inventory"""
+
+    def __init__(self, ring, detect_fn, window=5, interval=1.0, idle_interval=5.0,
+                 gate=None, gate_interval=0.25):
+        self.ring = ring
+        self.detect_fn = detect_fn
+        self.gate = gate                    # optional MotionGate; lets a scene change wake detection early
+        self.gate_interval = gate_interval  # how often the cheap gate check runs
+        # ...but never sooner than `interval` after the previous detector run, however busy the scene
+        self.window = window
+        self.interval = interval
+        self.idle_interval = idle_interval  # None/0 disables sampling outside a session
+        self.samples = 0
+        self._history = deque(maxlen=window)
+        self._snapshot = None
+        self._active = 0
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def activate(self):
+        """A capture session started: sample at the active rate"""
+        with self._cond:
+            self._active += 1
+            self._cond.notify_all()
+
+    def deactivate(self):
+        with self._cond:
+            self._active = max(0, self._active - 1)
+
+    def _current_interval(self):
+        with self._cond:
+            if self._active:
+                return self.interval
+            return self.idle_interval or None
+
+    def _loop(self):
+        last_seq = 0
+        last_sample = 0.0
+        last_run = 0.0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: not self._running or self._active or self.idle_interval)
+                if not self._running:
+                    return
+
+            started = time.time()
+            if self.gate is not None:
+                # Someone at the open fridge changes every frame; that must not turn into YOLO at the tick rate
+                cooldown = last_run + self.interval - started
+                if cooldown > 0:
+                    with self._cond:
+                        self._cond.wait(cooldown)
+                    continue
+            interval = self._current_interval() or 0.0
+            view = self.ring.wait_for(last_seq, timeout=1.0)
+            if view is not None:
+                with view:
+                    last_seq = view.seq
+                    due = started - last_sample >= interval
+                    try:
+                        if self.gate is None:
+                            items, ran = self.detect_fn(view.frame), True
+                        else:
+                            # Cheap check every tick: reuses the last result unless the scene changed
+                            items, ran = self.gate.detect(view.frame, self.detect_fn)
+                    except Exception as e:
+                        print(f"[INVENTORY] Detection failed: {e}")
+                        items, ran = None, False
+                        last_run = started
+                    timestamp = view.timestamp
+                if ran:
+                    last_run = started
+                if items is not None and (ran or due):
+                    self.record(items, last_seq, timestamp)
+                    last_sample = started
+
+            tick = self.gate_interval if self.gate is not None else interval
+            if tick:
+                with self._cond:
+                    # Wake early when a session starts so the active rate applies immediately
+                    self._cond.wait(max(0.0, tick - (time.time() - started)))
+
+    def record(self, items, seq, timestamp=None):
+        """Add one detection result (also used to seed the tracker from a synchronous detection)"""
+        with self._cond:
+            self._history.append(Counter(items))
+            self.samples += 1
+            self._snapshot = {
+                "items": majority_vote(self._history),
+                "seq": seq,
+                "timestamp": timestamp if timestamp is not None else time.time(),
+                "samples": len(self._history),
+            }
+
+    def snapshot(self, max_age=None):
+        """Latest smoothed inventory, or None if there is none (or it is older than max_age seconds)"""
+        with self._cond:
+            snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        if max_age is not None and time.time() - snapshot["timestamp"] > max_age:
+            return None
+        return dict(snapshot, items=Counter(snapshot["items"]))
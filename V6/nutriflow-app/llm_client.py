@@ -0,0 +1,153 @@
+import json
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metrics
+
+
+# --- Ollama client ---
+class OllamaClient:
+    """Pooled Ollama client that keeps the model resident and times every generation"""
+
+    def __init__(self, base_url="http://localhost:11434", model="llama3", keep_alive="30m",
+                 num_predict=900, pool_size=4, connect_timeout=5, read_timeout=60):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.keep_alive = keep_alive
+        self.num_predict = num_predict
+        self.timeout = (connect_timeout, read_timeout)
+
+        # One pooled session: connections to localhost:11434 are reused across calls
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                              max_retries=Retry(connect=2, backoff_factor=0.2))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.warm = False
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._failures = 0
+        self._last = None
+        self._ttft_total = 0.0
+        self._latency_total = 0.0
+        self._keep_alive_thread = None
+
+    def _payload(self, prompt, stream, options=None):
+        merged = {"num_predict": self.num_predict}
+        merged.update(options or {})
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": merged,
+        }
+
+    def warm_up(self):
+        """Load the model and run a one-token generation so the first real request is not cold"""
+        started = time.time()
+        try:
+            # An empty prompt only loads the model into memory
+            self.session.post(f"{self.base_url}/api/generate",
+                              json={"model": self.model, "keep_alive": self.keep_alive},
+                              timeout=(self.timeout[0], 300)).raise_for_status()
+            self.session.post(f"{self.base_url}/api/generate",
+                              json=self._payload("Hi", False, {"num_predict": 1}),
+                              timeout=(self.timeout[0], 300)).raise_for_status()
+        except requests.RequestException as e:
+            print(f"[LLM] Warm-up of {self.model} failed: {e}")
+            return False
+        self.warm = True
+        print(f"[LLM] {self.model} warmed up in {time.time() - started:.2f}s")
+        return True
+
+    def start_keep_alive(self, interval=600):
+        """Re-send the keep-alive hint periodically so Ollama never unloads the model while idle"""
+        if self._keep_alive_thread is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.session.post(f"{self.base_url}/api/generate",
+                                      json={"model": self.model, "keep_alive": self.keep_alive},
+                                      timeout=self.timeout)
+                except requests.RequestException as e:
+                    print(f"[LLM] Keep-alive ping failed: {e}")
+
+        self._keep_alive_thread = threading.Thread(target=loop, daemon=True)
+        self._keep_alive_thread.start()
+
+    def stream(self, prompt, options=None):
+        """Yield response tokens as Ollama produces them; raises RuntimeError on LLM errors.
+
+        A stream that ends without Ollama's "done" chunk (dropped connection) is an error too, so a
+        truncated answer is never mistaken for a complete one.
+        """
+        started = time.time()
+        first_token_at = None
+        tokens = 0
+        done = False
+        try:
+            with self.session.post(f"{self.base_url}/api/generate",
+                                   json=self._payload(prompt, True, options),
+                                   stream=True, timeout=self.timeout) as response:
+                if response.status_code != 200:
+                    raise RuntimeError(f"Status: {response.status_code}\n{response.text}")
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise RuntimeError(chunk["error"])
+                    if chunk.get("response"):
+                        if first_token_at is None:
+                            first_token_at = time.time()
+                        tokens += 1
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        done = True
+                        break
+            if not done:
+                raise RuntimeError(f"LLM stream ended after {tokens} tokens without completing")
+        except Exception:
+            with self._lock:
+                self._failures += 1
+            metrics.llm_requests.inc(outcome="error")
+            raise
+        self._record(started, first_token_at, tokens)
+
+    def generate(self, prompt, options=None):
+        return "".join(self.stream(prompt, options))
+
+    def _record(self, started, first_token_at, tokens):
+        total = time.time() - started
+        ttft = (first_token_at - started) if first_token_at else total
+        with self._lock:
+            self._calls += 1
+            self._ttft_total += ttft
+            self._latency_total += total
+            self._last = {"ttft_s": round(ttft, 3), "total_s": round(total, 3), "tokens": tokens}
+        metrics.llm_ttft_seconds.observe(ttft)
+        metrics.llm_total_seconds.observe(total)
+        metrics.llm_requests.inc(outcome="ok")
+        self.warm = True
+        print(f"[LLM] time-to-first-token {ttft:.2f}s, total {total:.2f}s, {tokens} tokens")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "model": self.model,
+                "warm": self.warm,
+                "calls": self._calls,
+                "failures": self._failures,
+                "last": self._last,
+                "avg_ttft_s": round(self._ttft_total / self._calls, 3) if self._calls else None,
+                "avg_total_s": round(self._latency_total / self._calls, 3) if self._calls else None,
+            }
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+PROFILE_FIELDS = ("allergies", "risk_factors", "preferred_items", "food_cusine", "age")
+
+
+def profile_hash(profile):
+    """Stable hash of the profile fields that change what the LLM should suggest"""
+    fields = {field: profile.get(field) for field in PROFILE_FIELDS}
+    canonical = json.dumps(fields, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def time_of_day_bucket(now=None):
+    hour = time.localtime(now).tm_hour
+    if 5 <= hour < 11:
+        return "breakfast"
+    if 11 <= hour < 16:
+        return "lunch"
+    if 16 <= hour < 22:
+        return "dinner"
+    return "late"
+
+
+def make_key(taken_items, profile_digest, bucket):
+    items = ",".join(f"{item.lower()}:{count}" for item, count in sorted(taken_items.items()) if count > 0)
+    return f"{items}|{profile_digest}|{bucket}"
+
+
+# --- Persistent LRU/TTL cache for meal suggestions ---
+class MealCache:
+    """Bounded LRU cache with a TTL that is saved to a JSON file so it survives restarts.
+
+    The file is read on first use, so merely importing the server (as spawned workers do) costs nothing.
+    """
+
+    def __init__(self, path=None, max_entries=256, ttl=6 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> {"text", "profile", "created"}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def get(self, key):
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry["created"] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["text"]
+
+    def put(self, key, text, profile_digest):
+        with self._lock:
+            self._ensure_loaded()
+            self._entries[key] = {"text": text, "profile": profile_digest, "created": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._save()
+
+    def invalidate_profile(self, profile_digest):
+        """Drop every entry generated for the given profile hash; returns how many were removed"""
+        with self._lock:
+            self._ensure_loaded()
+            stale = [key for key, entry in self._entries.items() if entry["profile"] == profile_digest]
+            for key in stale:
+                del self._entries[key]
+            if stale:
+                self._save()
+            return len(stale)
+
+    def stats(self):
+        with self._lock:
+            self._ensure_loaded()
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    # --- Persistence (callers hold the lock) ---
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self._loaded = True
+            self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[CACHE] Ignoring unreadable meal cache {self.path}: {e}")
+            return
+        now = time.time()
+        for key, entry in saved:
+            if now - entry["created"] <= self.ttl:
+                self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _save(self):
+        if not self.path:
+            return
+        # Write to a temp file and rename so a crash never leaves a half-written cache
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(list(self._entries.items()), f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[CACHE] Could not save meal cache: {e}")
@@ -0,0 +1,146 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import metrics
+
+
+# --- Meal generation jobs ---
+class MealJob:
+    """One background LLM generation; tokens are kept so late subscribers can replay them"""
+
+    def __init__(self, taken, trace_id=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.taken = taken
+        self.trace_id = trace_id
+        self.args = ()
+        self.key = None
+        self.status = "running"
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.first_token_at = None
+        self._tokens = []
+        self._cond = threading.Condition()
+
+    def append(self, token):
+        with self._cond:
+            if self.first_token_at is None:
+                self.first_token_at = time.time()
+            self._tokens.append(token)
+            self._cond.notify_all()
+
+    def finish(self, error=None):
+        with self._cond:
+            self.status = "error" if error else "done"
+            self.error = error
+            self.finished = time.time()
+            self._cond.notify_all()
+
+    @property
+    def text(self):
+        with self._cond:
+            return "".join(self._tokens)
+
+    def events(self, timeout=15.0):
+        """Yield ("token", text) as they arrive, then ("done", full_text) or ("error", message).
+
+        ("ping", None) is yielded when nothing arrived for `timeout` seconds so the caller can
+        keep the connection alive.
+        """
+        index = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self._tokens) > index or self.status != "running", timeout)
+                new_tokens = self._tokens[index:]
+                index += len(new_tokens)
+                status = self.status
+
+            for token in new_tokens:
+                yield "token", token
+            if status == "done":
+                yield "done", self.text
+                return
+            if status == "error":
+                yield "error", self.error
+                return
+            if not new_tokens:
+                yield "ping", None
+
+    def timings(self):
+        ttft = self.first_token_at - self.created if self.first_token_at else None
+        total = self.finished - self.created if self.finished else None
+        return {
+            "ttft_ms": round(ttft * 1000, 2) if ttft is not None else None,
+            "total_ms": round(total * 1000, 2) if total is not None else None,
+        }
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "taken_items": dict(self.taken),
+            "meal_suggestion": self.text,
+            "error": self.error,
+            "timings": self.timings(),
+        }
+
+
+class MealJobManager:
+    """Runs meal generation on background threads and keeps the most recent jobs for lookup"""
+
+    def __init__(self, stream_fn, max_jobs=50, on_finish=None):
+        self._stream_fn = stream_fn
+        self._on_finish = on_finish
+        self._max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._running = {}
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.coalesced = 0
+
+    def submit(self, taken, *args, trace_id=None, key=None):
+        """Start a job; extra args (the user's profile) are passed on to stream_fn after `taken`.
+
+        Jobs with a key (the prompt's hash) are shared: while one is running, submitting the same key
+        returns that job, so identical concurrent requests cost a single LLM call.
+        """
+        with self._lock:
+            running = self._running.get(key) if key is not None else None
+            if running is not None:
+                self.coalesced += 1
+                metrics.coalesced_requests.inc(kind="meal_job")
+                return running
+            job = MealJob(taken, trace_id)
+            job.args = args
+            job.key = key
+            self.submitted += 1
+            self._jobs[job.id] = job
+            if key is not None:
+                self._running[key] = job
+            while len(self._jobs) > self._max_jobs:
+                self._jobs.popitem(last=False)
+        threading.Thread(target=self._run, args=(job,), daemon=True).start()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job):
+        try:
+            for token in self._stream_fn(job.taken, *job.args):
+                job.append(token)
+            job.finish()
+        except Exception as e:
+            job.finish(error=f"[LLM ERROR] {str(e)}")
+        with self._lock:
+            if self._running.get(job.key) is job:
+                del self._running[job.key]
+        if self._on_finish is not None:
+            self._on_finish(job)
+
+    def stats(self):
+        with self._lock:
+            return {"submitted": self.submitted, "running": len(self._running), "coalesced": self.coalesced}
@@ -0,0 +1,223 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# --- Prometheus-style metrics ---
+# A dependency-free subset of the Prometheus text exposition format. Updates are a dict lookup and
+# an add under a per-metric lock, so the instrumentation can stay on in production.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}"
+                for key, v in sorted(values.items())]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            values = {key: (list(entry[0]), entry[1], entry[2]) for key, entry in self._values.items()}
+        lines = []
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total!r}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Callback(_Metric):
+    """Gauge or counter read from existing state at scrape time, so the hot path pays nothing"""
+
+    def __init__(self, name, documentation, fn, kind="gauge", labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.fn = fn
+
+    def samples(self):
+        try:
+            value = self.fn()
+        except Exception:
+            return []
+        if not isinstance(value, dict):
+            value = {(): value}
+        return [f"{self.name}{_format_labels(self.labelnames, key if isinstance(key, tuple) else (key,))} "
+                f"{_format_value(v)}" for key, v in sorted(value.items()) if v is not None]
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name, documentation, fn, kind="gauge", labelnames=()):
+        return self.register(Callback(name, documentation, fn, kind, labelnames))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# --- Hot-path series, updated by the modules that own the work ---
+stream_encode_seconds = REGISTRY.histogram(
+    "nutriflow_stream_encode_seconds", "Downscale + JPEG encode time per streamed or /video-frame frame", ["camera", "tier"],
+    buckets=(0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25))
+stream_encoded_bytes = REGISTRY.counter(
+    "nutriflow_stream_encoded_bytes_total", "Bytes of JPEG produced for /video-feed and /video-frame",
+    ["camera", "tier"])
+stream_frames_encoded = REGISTRY.counter(
+    "nutriflow_stream_frames_encoded_total", "Frames encoded for /video-feed and /video-frame", ["camera", "tier"])
+video_frame_responses = REGISTRY.counter(
+    "nutriflow_video_frame_responses_total", "/video-frame answers by outcome (ok, not_modified, no_frame)",
+    ["camera", "outcome"])
+
+frame_alloc_bytes = REGISTRY.counter(
+    "nutriflow_frame_alloc_bytes_total", "Bytes allocated for frame buffers", ["site"])
+frame_allocations = REGISTRY.counter(
+    "nutriflow_frame_allocations_total", "Frame buffer allocations", ["site"])
+frame_copy_bytes = REGISTRY.counter(
+    "nutriflow_frame_copy_bytes_total", "Bytes of pixel data copied between buffers", ["site"])
+
+detector_inference_seconds = REGISTRY.histogram(
+    "nutriflow_detector_inference_seconds", "YOLO inference latency", ["backend"])
+detections = REGISTRY.counter(
+    "nutriflow_detections_total", "Objects detected per class", ["cls"])
+
+batch_size = REGISTRY.histogram(
+    "nutriflow_batch_size", "Frames per detector batch", ["batcher"], buckets=(1, 2, 3, 4, 6, 8, 12, 16))
+batch_wait_seconds = REGISTRY.histogram(
+    "nutriflow_batch_wait_seconds", "Time a frame waited for its batch to close", ["batcher"],
+    buckets=(0.001, 0.002, 0.005, 0.01, 0.02, 0.05))
+
+inference_tasks = REGISTRY.counter(
+    "nutriflow_inference_tasks_total", "Inference pool tasks by outcome", ["outcome"])
+inference_worker_restarts = REGISTRY.counter(
+    "nutriflow_inference_worker_restarts_total", "Inference worker processes respawned after a crash or timeout")
+
+llm_ttft_seconds = REGISTRY.histogram(
+    "nutriflow_llm_time_to_first_token_seconds", "LLM time to first token",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0))
+llm_total_seconds = REGISTRY.histogram(
+    "nutriflow_llm_total_seconds", "LLM generation latency",
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0))
+llm_requests = REGISTRY.counter(
+    "nutriflow_llm_requests_total", "LLM generations by outcome", ["outcome"])
+
+coalesced_requests = REGISTRY.counter(
+    "nutriflow_coalesced_requests_total", "Duplicate requests answered by an identical in-flight one", ["kind"])
+
+http_request_seconds = REGISTRY.histogram(
+    "nutriflow_http_request_seconds", "Flask request latency (time to response headers for streams)",
+    ["route", "method", "status"])
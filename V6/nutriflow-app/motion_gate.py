@@ -0,0 +1,78 @@
+import threading
+import time
+
+import cv2
+
+
+# --- Scene-change gate in front of the detector ---
+class MotionGate:
+    """Skips YOLO when a downscaled frame difference says the scene has not changed"""
+
+    def __init__(self, mean_threshold=4.0, pixel_threshold=25, changed_fraction=0.02,
+                 size=(64, 36), max_reuse_age=30.0):
+        self.mean_threshold = mean_threshold      # mean abs grey-level difference that counts as change
+        self.pixel_threshold = pixel_threshold    # per-pixel difference that marks a pixel as changed
+        self.changed_fraction = changed_fraction  # or this share of changed pixels (a door edge, a hand)
+        self.size = size
+        self.max_reuse_age = max_reuse_age        # re-run anyway after this many seconds
+        self._lock = threading.Lock()
+        self._reference = None
+        self._result = None
+        self._result_time = 0.0
+        self.checks = 0
+        self.skips = 0
+        self.runs = 0
+        self.inference_seconds = 0.0
+
+    def _small(self, frame):
+        grey = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        small = cv2.resize(grey, self.size, interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(small, (3, 3), 0)
+
+    def _changed(self, small):
+        if self._reference is None or self._reference.shape != small.shape:
+            return True
+        diff = cv2.absdiff(small, self._reference)
+        if float(diff.mean()) > self.mean_threshold:
+            return True
+        return float((diff > self.pixel_threshold).mean()) > self.changed_fraction
+
+    def detect(self, frame, detect_fn):
+        """Return (items, ran): the cached result if the scene is unchanged, else a fresh detection"""
+        small = self._small(frame)
+        with self._lock:
+            self.checks += 1
+            fresh = time.time() - self._result_time < self.max_reuse_age
+            if self._result is not None and fresh and not self._changed(small):
+                self.skips += 1
+                return list(self._result), False
+
+        started = time.time()
+        items = detect_fn(frame)
+        elapsed = time.time() - started
+
+        with self._lock:
+            self.runs += 1
+            self.inference_seconds += elapsed
+            self._reference = small
+            self._result = list(items)
+            self._result_time = time.time()
+        return items, True
+
+    def reset(self):
+        """Force the next call to run the detector"""
+        with self._lock:
+            self._reference = None
+            self._result = None
+
+    def stats(self):
+        with self._lock:
+            avg = self.inference_seconds / self.runs if self.runs else 0.0
+            return {
+                "checks": self.checks,
+                "skips": self.skips,
+                "runs": self.runs,
+                "hit_rate": round(self.skips / self.checks, 3) if self.checks else 0.0,
+                "avg_inference_ms": round(avg * 1000, 1),
+                "saved_inference_s": round(self.skips * avg, 2),
+            }
@@ -0,0 +1,879 @@
+import time
+import hashlib
+import math
+_import_started = time.time()
+
+from collections import Counter
+import threading
+import json
+from flask import Flask, request, jsonify, Response, g
+from flask_cors import CORS
+import config
+import metrics
+import tracing
+from detectors import load_detector, DetectorNotReady
+from inference_pool import InferencePool, InferenceError
+from batching import MicroBatcher
+from cameras import Camera, CameraRegistry, parse_camera_spec, taken_between
+from frame_broadcaster import TooManyTiers
+from frame_sources import open_source
+from server_state import ServerState
+from sessions import SessionManager, SessionLimitReached
+from singleflight import SingleFlight
+from readiness import Readiness
+from profiling import RequestProfiler
+from meal_jobs import MealJobManager
+from llm_client import OllamaClient
+from allergens import AllergenDatabase
+from profile_store import ProfileStore, InvalidProfile, valid_user_id
+from meal_cache import MealCache, time_of_day_bucket, make_key
+
+# --- Flask App Setup ---
+app = Flask(__name__)
+CORS(app, expose_headers=["ETag", "X-Frame-Seq"])
+
+# --- Startup Readiness ---
+# The HTTP server comes up first; camera, detector and LLM load in the background
+readiness = Readiness(required=("camera", "detector"))
+readiness.record_phase("module imports", time.time() - _import_started)
+
+# --- YOLO Model ---
+# Loaded by start_backend(); NUTRIFLOW_DETECTOR_BACKEND picks torch/onnx/openvino/int8
+detector = None
+batcher = None
+
+# --- Shared State ---
+state = ServerState()
+
+# --- Cameras ---
+# NUTRIFLOW_CAMERAS lists every camera ("main=2,door=3"); NUTRIFLOW_CAMERA_SOURCE alone gives one camera.
+# Each has its own capture thread, ring, stream and background inventory; all share one detector
+cameras = CameraRegistry(
+    Camera(camera_id,
+           open_source(source, config.CAMERA_WIDTH, config.CAMERA_HEIGHT, realtime=config.SOURCE_REALTIME,
+                       fps=config.SOURCE_FPS, loop=config.SOURCE_LOOP),
+           lambda frame: detect_items_from_frame(frame),
+           capacity=config.FRAME_RING_SIZE, shared=config.SHARED_FRAMES, quality=config.STREAM_JPEG_QUALITY,
+           window=config.INVENTORY_WINDOW, interval=config.INVENTORY_INTERVAL,
+           idle_interval=config.INVENTORY_IDLE_INTERVAL, max_tiers=config.STREAM_MAX_TIERS,
+           tier_idle=config.STREAM_TIER_IDLE)
+    for camera_id, source in parse_camera_spec(config.CAMERAS, config.CAMERA_SOURCE))
+# The first camera is the default one: /video-feed and the desktop preview show it
+camera = cameras.default.capture
+broadcaster = cameras.default.broadcaster
+
+# --- User Profiles ---
+# One profile per user id in SQLite; reads are served from the store's in-memory snapshots
+DEFAULT_PROFILE = {
+    "name": "John",
+    "allergies": ["peanuts", "lactose"],
+    "preferred_items": ["low-carb", "high-protein", "vegetables"],
+    "risk_factors": ["heart disease", "diabetes"],
+    "food_cusine": ["Italian", "Mexican", "Indian"],
+    "age": 30
+}
+profiles = ProfileStore(config.PROFILE_DB or None, DEFAULT_PROFILE)
+
+def get_user_profile(user_id=None):
+    return profiles.get(user_id or config.DEFAULT_USER)
+
+def current_profile(user_id=None):
+    return get_user_profile(user_id).to_dict()
+
+# --- LLM ---
+llm = OllamaClient(base_url=config.OLLAMA_URL, model=config.LLM_MODEL,
+                   keep_alive=config.LLM_KEEP_ALIVE, num_predict=config.LLM_NUM_PREDICT)
+
+def build_meal_prompt(taken_items, profile=None):
+    profile = profile or get_user_profile()
+    name, allergies, age = profile["name"], profile["allergies"], profile["age"]
+    preferred_items, risk_factors, food_cusine = profile["preferred_items"], profile["risk_factors"], profile["food_cusine"]
+    items_text = ", ".join([f"{count} {item}" for item, count in taken_items.items()])
+    prompt = f"""
+You are a smart health-focused AI meal planner. The following food items were just taken out of the fridge: {items_text}.
+
+The person has DNA data suggesting a higher risk of {risk_factors}, is allergic to {allergies}, and prefers {preferred_items} as well as they like {food_cusine} cuisines.
+
+They are {age} years old. Their name is {name}.
+
+Please suggest 3 healthy meal ideas using ONLY the ingredients taken out, tailored to these needs and based on the time of day.
+
+Format your response EXACTLY like this:
+
+MEAL 1: [Meal Name]
+DESCRIPTION: [One sentence description]
+CALORIES: [estimated calories per serving]
+INGREDIENTS:
+- [ingredient 1]
+- [ingredient 2]
+- [ingredient 3]
+INSTRUCTIONS:
+1. [step 1]
+2. [step 2]
+3. [step 3]
+
+MEAL 2: [Meal Name]
+DESCRIPTION: [One sentence description]
+CALORIES: [estimated calories per serving]
+INGREDIENTS:
+- [ingredient 1]
+- [ingredient 2]
+INSTRUCTIONS:
+1. [step 1]
+2. [step 2]
+
+MEAL 3: [Meal Name]
+DESCRIPTION: [One sentence description]
+CALORIES: [estimated calories per serving]
+INGREDIENTS:
+- [ingredient 1]
+- [ingredient 2]
+INSTRUCTIONS:
+1. [step 1]
+2. [step 2]
+
+Make sure to:
+- Avoid any allergens ({allergies})
+- Focus on health benefits for {risk_factors}
+- Include estimated calories per serving
+- Use only the ingredients that were taken out
+- Make recipes suitable for someone who is {age} years old
+"""
+    return prompt
+
+def stream_meal_suggestion(taken_items, profile=None):
+    """Yield response tokens from Ollama as they are generated"""
+    return llm.stream(build_meal_prompt(taken_items, profile))
+
+meal_cache = MealCache(config.MEAL_CACHE or None)
+
+def cached_meal_stream(taken_items, profile=None):
+    """Serve a cached suggestion when possible, otherwise stream from Ollama and remember the result.
+
+    Only a completed stream is remembered: the LLM client raises when one ends early.
+    """
+    profile = profile or get_user_profile()
+    digest = profile.digest
+    key = make_key(taken_items, digest, time_of_day_bucket())
+    cached = meal_cache.get(key)
+    if cached is not None:
+        print("[CACHE] Meal suggestion served from cache")
+        yield cached
+        return
+    
+    tokens = []
+    for token in stream_meal_suggestion(taken_items, profile):
+        tokens.append(token)
+        yield token
+    if tokens:
+        meal_cache.put(key, "".join(tokens), digest)
+
+def generate_meal_suggestion(taken_items, profile=None):
+    try:
+        return "".join(cached_meal_stream(taken_items, profile)) or "[LLM returned nothing]"
+    except Exception as e:
+        return f"[LLM ERROR] {str(e)}"
+
+def on_meal_job_finished(job):
+    # The LLM runs after the capture request has returned, so it is logged against the same trace id
+    tracing.log_event("meal_job", trace_id=job.trace_id, job_id=job.id, status=job.status, **job.timings())
+    if job.status == "done":
+        update_status("Meal suggestions with calories generated successfully!")
+        print(f"[LLM] Generated meal suggestions with nutritional info (job {job.id})")
+    else:
+        update_status("Meal suggestion generation failed")
+        print(f"[LLM] Job {job.id} failed: {job.error}")
+
+meal_jobs = MealJobManager(cached_meal_stream, on_finish=on_meal_job_finished)
+
+# --- Allergens ---
+# Compiled once per profile version, against that version's allergies. The database is loaded by
+# start_backend() (or first use), not on import: spawned inference workers re-import this module
+_allergen_db = None
+_allergen_db_lock = threading.Lock()
+
+def allergen_database():
+    global _allergen_db
+    with _allergen_db_lock:
+        if _allergen_db is None:
+            _allergen_db = AllergenDatabase.load(config.ALLERGEN_DB)
+        return _allergen_db
+
+def allergen_matcher_for(profile):
+    return profile.derived("allergens", lambda p: allergen_database().compile(p["allergies"]))
+
+def check_allergies(taken_items, profile=None):
+    """Check if any taken items match user allergies"""
+    return allergen_matcher_for(profile or get_user_profile()).check(taken_items.keys())
+
+def update_status(message):
+    state.set_status(message)
+
+def detect_items_from_frame(frame):
+    if detector is None:
+        raise DetectorNotReady("Detector is still warming up")
+    with tracing.span("yolo_inference"):
+        if batcher is not None:
+            # Concurrent callers (tracker, capture requests) share one forward pass
+            return batcher.submit(frame)
+        return detector.detect(frame)
+
+# --- Background Inventory ---
+# Every camera's tracker keeps a smoothed inventory; requests merge them into one fridge view
+def fridge_snapshot():
+    """Merged inventory; cameras without a recent one detect first"""
+    with tracing.span("inventory_snapshot"):
+        return cameras.snapshot(max_age=config.INVENTORY_MAX_AGE, refresh=True)
+
+def fridge_now():
+    """Unsmoothed view of every camera's newest frame. An item taken a moment ago is already gone from it;
+    the smoothed inventory only drops it after most of its window has seen it missing."""
+    with tracing.span("inventory_observe"):
+        return cameras.observe()
+
+# --- Capture Sessions ---
+# Each /capture-before opens a session with its own baseline; the shared background tracker runs at the
+# active rate while any session is watching
+sessions = SessionManager(max_sessions=config.MAX_SESSIONS, idle_timeout=config.SESSION_IDLE_TIMEOUT,
+                          on_watch=lambda session: cameras.activate(),
+                          on_unwatch=lambda session: cameras.deactivate())
+
+def find_session(session_id=None, user_id=None, status=None):
+    """The named session; clients that don't send one get the most recent matching session"""
+    if session_id:
+        session = sessions.get(session_id)
+        return session if session is not None and (status is None or session.status == status) else None
+    return sessions.latest(user_id=user_id, status=status)
+
+def traced(name, fn, *args):
+    """Run fn inside a trace; the stage timings ride along in the result under 'trace'"""
+    with tracing.trace(name) as trace:
+        result = fn(*args)
+    if trace.total_ms is not None:
+        result["trace"] = trace.to_dict()
+    return result
+
+def handle_capture_before(user_id=None):
+    return traced("capture_before", _handle_capture_before, user_id)
+
+def _handle_capture_before(user_id):
+    # Normally the background trackers already have a fresh inventory and no inference is needed
+    snapshot = fridge_snapshot()
+    if snapshot is None:
+        update_status("ERROR: No camera frame available")
+        return {"success": False, "error": "No camera frame available"}
+    
+    session = sessions.create(user_id or config.DEFAULT_USER, snapshot["items"].elements(), snapshot["seq"],
+                              snapshot["by_camera"])
+    before_items = list(session.before_items.elements())
+    tracing.annotate(session_id=session.id)
+    
+    update_status(f"Captured full fridge: {len(before_items)} items detected")
+    print(f"[CAPTURE] Full fridge items: {dict(session.before_items)} (session {session.id})")
+    
+    update_status("Monitoring fridge - take items out when ready")
+    return {"success": True, "session_id": session.id, "before_items": before_items,
+            "before_by_camera": {camera_id: dict(items) for camera_id, items in snapshot["by_camera"].items()}}
+
+# Double-clicks and client retries of /capture-after join the analysis already running for that session
+capture_flights = SingleFlight("capture_after", linger=config.CAPTURE_COALESCE_LINGER)
+
+def find_capture_session(session_id=None, user_id=None):
+    """The session a /capture-after is for, including one that a duplicate request closed moments ago"""
+    linger = capture_flights.linger
+    if session_id:
+        return sessions.get(session_id, closed_within=linger)
+    return (sessions.latest(user_id=user_id, status=("watching", "analyzing"))
+            or sessions.recently_closed(user_id=user_id, within=linger))
+
+def compare_and_summarize(user_id=None, session_id=None):
+    session = find_capture_session(session_id, user_id)
+    if session is None:
+        return {"success": False, "error": "No capture in progress - capture the full fridge first"}
+    
+    # Same session, same frame, same profile version: one analysis, one answer
+    profile = get_user_profile(session.user_id)
+    frame_seqs = tuple(sorted(cameras.latest_seqs().items()))
+    key = (session.id, sessions.pin_after_seq(session, frame_seqs), profile.version)
+    result, shared = capture_flights.do(key, traced, "capture_after", _compare_and_summarize, session, profile)
+    if shared:
+        print(f"[CAPTURE] Duplicate capture-after for session {session.id} joined the running analysis")
+        result = dict(result, coalesced=True)
+    return result
+
+def _resume_watching(session):
+    """Put a session back to watching after an analysis that failed or found nothing (caller holds session.lock)"""
+    session.status = "watching"
+    sessions.unpin_after_seq(session)
+    sessions.watch(session)
+
+def _compare_and_summarize(session, profile):
+    with session.lock:
+        if session.status != "watching":
+            return {"success": False, "error": f"Capture session is {session.status}"}
+        session.status = "analyzing"
+        sessions.unwatch(session)
+        tracing.annotate(session_id=session.id, user_id=profile.user_id, profile_version=profile.version)
+        update_status("Analyzing what was taken...")
+        
+        # The newest frames as they are now; the motion gates skip YOLO for cameras whose scene is unchanged
+        try:
+            snapshot = fridge_now()
+        except Exception:
+            # Detector busy or down: the client gets its error and may retry this same session
+            _resume_watching(session)
+            update_status("ERROR: Detection failed")
+            raise
+
+        if snapshot is None:
+            # Keep the session so the user can simply try again
+            _resume_watching(session)
+            update_status("ERROR: No frame available for analysis")
+            return {"success": False, "session_id": session.id, "error": "No frame available for analysis"}
+        
+        with tracing.span("diff"):
+            session.after_items = Counter(snapshot["items"])
+            taken, taken_by_camera = taken_between(session.before_by_camera, snapshot["by_camera"])
+        tracing.annotate(taken_items=dict(taken))
+        
+        if not taken:
+            # Keep the baseline: the client can check again once the item is out, or cancel the session
+            _resume_watching(session)
+            update_status("No items were taken from the fridge yet - still monitoring")
+            return {"success": False, "session_id": session.id, "status": session.status,
+                    "message": "Nothing was taken out"}
+        
+        # Check for allergy warnings
+        with tracing.span("check_allergies"):
+            allergy_warnings = check_allergies(taken, profile)
+        
+        if allergy_warnings:
+            for warning in allergy_warnings:
+                print(f"[ALLERGY WARNING] {warning['warning']}")
+            
+            # Park the result until the user answers through /confirm-allergies
+            session.pending = {"taken": taken, "allergy_warnings": allergy_warnings}
+            session.status = "awaiting_confirmation"
+            update_status("Allergy warning - waiting for confirmation")
+            return {
+                "success": False,
+                "needs_confirmation": True,
+                "session_id": session.id,
+                "message": "Allergy warnings detected. Confirm to continue with meal suggestions.",
+                "taken_items": dict(taken),
+                "taken_by_camera": taken_by_camera,
+                "allergy_warnings": allergy_warnings
+            }
+        
+        sessions.close(session)
+        return dict(generate_meals(taken, allergy_warnings, profile), session_id=session.id,
+                    taken_by_camera=taken_by_camera)
+
+def confirm_allergies(confirmed, session_id=None, user_id=None):
+    return traced("confirm_allergies", _confirm_allergies, confirmed, session_id, user_id)
+
+def _confirm_allergies(confirmed, session_id, user_id):
+    session = find_session(session_id, user_id, status="awaiting_confirmation")
+    if session is None:
+        return {"success": False, "error": "No allergy confirmation pending"}
+    
+    with session.lock:
+        pending = session.pending
+        if pending is None:
+            return {"success": False, "error": "No allergy confirmation pending"}
+        sessions.close(session)
+    
+    if not confirmed:
+        update_status("Meal generation cancelled due to allergy concerns")
+        return {
+            "success": False, 
+            "session_id": session.id,
+            "message": "Meal generation cancelled due to allergy warnings",
+            "allergy_warnings": pending["allergy_warnings"]
+        }
+    
+    # Latest version of the profile the warning was raised for
+    result = generate_meals(pending["taken"], pending["allergy_warnings"], get_user_profile(session.user_id))
+    return dict(result, session_id=session.id)
+
+def generate_meals(taken, allergy_warnings, profile=None):
+    profile = profile or get_user_profile()
+    summary = "\n".join(f"{item}: {count}" for item, count in taken.items())
+    update_status(f"Items taken: {', '.join(taken.keys())} - Generating meal suggestions...")
+    
+    print(f"[ANALYSIS] Items taken: {dict(taken)}")
+    
+    # Generation runs in the background; the client follows it on /meal-stream/<job_id>.
+    # An identical prompt that is already generating is joined instead of sent to Ollama again
+    prompt_key = hashlib.sha1(f"{llm.model}\n{build_meal_prompt(taken, profile)}".encode("utf-8")).hexdigest()
+    with tracing.span("submit_meal_job"):
+        job = meal_jobs.submit(taken, profile, trace_id=tracing.current_id(), key=prompt_key)
+    tracing.annotate(job_id=job.id, job_shared=job.trace_id != tracing.current_id())
+    print(f"[LLM] Generating meal suggestions with calories (job {job.id})...")
+    
+    return {
+        "success": True, 
+        "taken_items": dict(taken),
+        "user_id": profile.user_id,
+        "job_id": job.id,
+        "stream_url": f"/meal-stream/{job.id}",
+        "summary": summary,
+        "allergy_warnings": allergy_warnings if allergy_warnings else []
+    }
+
+def reset_capture(session_id=None):
+    """Close one session, or every open session (the desktop "Clear Status" button)"""
+    if session_id:
+        session = sessions.get(session_id)
+        if session is not None:
+            sessions.close(session, status="cancelled")
+    else:
+        sessions.close_all()
+    update_status("Ready")
+
+# --- Flask Endpoints ---
+
+class InvalidStreamTier(ValueError):
+    pass
+
+@app.errorhandler(InvalidStreamTier)
+def invalid_stream_tier(e):
+    return jsonify({"success": False, "error": str(e)}), 400
+
+@app.errorhandler(TooManyTiers)
+def too_many_tiers(e):
+    return jsonify({"success": False, "error": str(e)}), 429
+
+def request_stream_tier():
+    """?w=320&fps=5&q=60 (all optional): width in px, frame rate and JPEG quality of the stream"""
+    tier = {}
+    for arg, key in (("w", "width"), ("fps", "fps"), ("q", "quality")):
+        value = request.args.get(arg)
+        if value is None:
+            continue
+        try:
+            tier[key] = float(value)
+        except ValueError:
+            raise InvalidStreamTier(f"Invalid {arg}: {value!r}")
+        if not math.isfinite(tier[key]) or tier[key] <= 0:
+            raise InvalidStreamTier(f"{arg} must be a positive number")
+    return tier
+
+def mjpeg_response(feed):
+    # Phones and thumbnails ask for a small tier; every client of a tier shares one encode per frame
+    return Response(feed.stream(**request_stream_tier()),
+                    mimetype='multipart/x-mixed-replace; boundary=frame')
+
+@app.route('/video-feed')
+def video_feed():
+    return mjpeg_response(broadcaster)
+
+@app.route('/video-feed/<camera_id>')
+def camera_video_feed(camera_id):
+    selected = cameras.get(camera_id)
+    if selected is None:
+        return jsonify({"success": False, "error": f"Unknown camera {camera_id}", "cameras": cameras.ids()}), 404
+    return mjpeg_response(selected.broadcaster)
+
+def frame_etag(feed, seq):
+    # Sequence numbers restart with the capture, the camera id keeps two cameras' tags apart
+    return f"{feed.name}-{seq}"
+
+def single_frame_response(feed):
+    """Newest frame as image/jpeg, tagged with its sequence number.
+
+    If-None-Match with the current tag gets 304 without encoding anything; ?after=<seq> waits (up to
+    ?wait= seconds, at most VIDEO_FRAME_MAX_WAIT) for a newer frame and answers 304 if none came.
+    """
+    tier = request_stream_tier()
+    after, wait = request.args.get("after"), request.args.get("wait")
+    try:
+        after = int(after) if after is not None else None
+        wait = float(wait) if wait is not None else config.VIDEO_FRAME_MAX_WAIT
+    except ValueError:
+        raise InvalidStreamTier("after must be a frame sequence number and wait a number of seconds")
+    if (after is not None and after < 0) or not math.isfinite(wait) or wait < 0:
+        raise InvalidStreamTier("after must not be negative and wait must be a finite, non-negative number")
+
+    seq, jpeg = feed.ring.latest_seq, None
+    if after is not None:
+        seq, jpeg = feed.latest_jpeg(after, timeout=min(wait, config.VIDEO_FRAME_MAX_WAIT),
+                                     width=tier.get("width"), quality=tier.get("quality"))
+    elif not (seq and request.if_none_match.contains(frame_etag(feed, seq))):
+        seq, jpeg = feed.latest_jpeg(width=tier.get("width"), quality=tier.get("quality"))
+        if jpeg is None:
+            seq = 0
+
+    if not seq:
+        metrics.video_frame_responses.inc(camera=feed.name, outcome="no_frame")
+        return jsonify({"success": False, "error": "No frame available"}), 404
+    if jpeg is None:
+        metrics.video_frame_responses.inc(camera=feed.name, outcome="not_modified")
+        response = Response(status=304)
+    else:
+        metrics.video_frame_responses.inc(camera=feed.name, outcome="ok")
+        response = Response(jpeg, mimetype='image/jpeg')
+    response.set_etag(frame_etag(feed, seq))
+    response.headers["X-Frame-Seq"] = str(seq)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+@app.route('/video-frame')
+def video_frame():
+    return single_frame_response(broadcaster)
+
+@app.route('/video-frame/<camera_id>')
+def camera_video_frame(camera_id):
+    selected = cameras.get(camera_id)
+    if selected is None:
+        return jsonify({"success": False, "error": f"Unknown camera {camera_id}", "cameras": cameras.ids()}), 404
+    return single_frame_response(selected.broadcaster)
+
+class InvalidUserId(ValueError):
+    pass
+
+@app.errorhandler(InvalidUserId)
+def invalid_user_id(e):
+    return jsonify({"success": False, "error": str(e)}), 400
+
+def request_user_id(default=config.DEFAULT_USER):
+    """user_id from the query string, X-User-Id header or JSON body; `default` when absent"""
+    data = request.get_json(silent=True)
+    user_id = (request.args.get("user_id") or request.headers.get("X-User-Id")
+               or (data.get("user_id") if isinstance(data, dict) else None))
+    if user_id is None:
+        return default
+    if not valid_user_id(user_id):
+        raise InvalidUserId("Invalid user_id")
+    return user_id
+
+@app.errorhandler(InvalidProfile)
+def invalid_profile(e):
+    return jsonify({"success": False, "error": str(e)}), 400
+
+@app.route('/update-profile', methods=['POST'])
+def update_profile():
+    user_id = request_user_id()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"success": False, "error": "Expected a JSON object"}), 400
+    
+    old, new = profiles.update(user_id, data)
+    
+    if new.digest != old.digest:
+        dropped = meal_cache.invalidate_profile(old.digest)
+        print(f"[CACHE] Profile changed, dropped {dropped} cached meal suggestions")
+    
+    print(f"[PROFILE] Updated user profile for {new['name']} ({user_id}, v{new.version})")
+    print(f"[PROFILE] Allergies: {new['allergies']}")
+    return {"success": True, "user_id": user_id, "version": new.version}
+
+@app.route('/get-profile', methods=['GET'])
+def get_profile():
+    return jsonify(current_profile(request_user_id()))
+
+def detector_not_ready():
+    return jsonify({"success": False, "error": "Detector is still warming up, try again shortly"}), 503
+
+@app.errorhandler(InferenceError)
+def inference_failed(e):
+    # Pool full, timed out or a worker died mid-task: the client can retry
+    update_status(f"ERROR: {e}")
+    return jsonify({"success": False, "error": str(e)}), 503
+
+def request_session_id():
+    data = request.get_json(silent=True)
+    return request.args.get("session_id") or (data.get("session_id") if isinstance(data, dict) else None)
+
+@app.errorhandler(SessionLimitReached)
+def session_limit_reached(e):
+    update_status(f"ERROR: {e}")
+    return jsonify({"success": False, "error": str(e)}), 429
+
+@app.route('/capture-before', methods=['POST'])
+def flask_capture_before():
+    if not readiness.is_ready("detector"):
+        return detector_not_ready()
+    result = handle_capture_before(request_user_id())
+    return jsonify(result)
+
+@app.route('/capture-after', methods=['POST'])
+def flask_capture_after():
+    if not readiness.is_ready("detector"):
+        return detector_not_ready()
+    # Without a session id: the requesting user's (or anyone's) most recent capture
+    result = compare_and_summarize(request_user_id(default=None), request_session_id())
+    return jsonify(result)
+
+@app.route('/confirm-allergies', methods=['POST'])
+def flask_confirm_allergies():
+    data = request.get_json(silent=True) or {}
+    result = confirm_allergies(bool(data.get('confirm', False)), request_session_id(), request_user_id(default=None))
+    return jsonify(result)
+
+@app.route('/session/<session_id>', methods=['GET', 'DELETE'])
+def capture_session(session_id):
+    session = sessions.get(session_id)
+    if session is None:
+        return jsonify({"success": False, "error": "Unknown or expired session"}), 404
+    if request.method == 'DELETE':
+        reset_capture(session_id)
+        return jsonify({"success": True, "session_id": session_id, "status": session.status})
+    return jsonify(session.to_dict())
+
+@app.route('/meal-stream/<job_id>')
+def meal_stream(job_id):
+    job = meal_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown meal job"}), 404
+    
+    def events():
+        for kind, payload in job.events():
+            if kind == "ping":
+                yield ": ping\n\n"
+            elif kind == "token":
+                yield f"data: {json.dumps({'token': payload})}\n\n"
+            elif kind == "done":
+                yield f"event: done\ndata: {json.dumps({'meal_suggestion': payload})}\n\n"
+            else:
+                yield f"event: error\ndata: {json.dumps({'error': payload})}\n\n"
+    
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/meal-job/<job_id>')
+def meal_job(job_id):
+    job = meal_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown meal job"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/inventory')
+def get_inventory():
+    snapshot = cameras.snapshot()
+    if snapshot is None:
+        return jsonify({"success": False, "error": "No inventory yet"}), 404
+    
+    result = {
+        "success": True,
+        "items": dict(snapshot["items"]),
+        "by_camera": {camera_id: dict(items) for camera_id, items in snapshot["by_camera"].items()},
+        "frame_seq": snapshot["seq"],
+        "age_s": round(time.time() - snapshot["timestamp"], 2),
+        "samples": snapshot["samples"]
+    }
+    session = find_session(request_session_id(), request_user_id(default=None), status="watching")
+    if session is not None:
+        result["session_id"] = session.id
+        taken, taken_by_camera = taken_between(session.before_by_camera, snapshot["by_camera"])
+        result["taken_items"] = dict(taken)
+        result["taken_by_camera"] = taken_by_camera
+    return jsonify(result)
+
+# --- Profiling ---
+# POST /admin/profile {"requests": N, "mode": "cprofile"|"sample"} arms it; GET returns the dump
+profiler = RequestProfiler()
+
+# --- Metrics ---
+# Hot paths (encode, inference, LLM) update their own series; these are read at scrape time
+metrics.REGISTRY.callback("nutriflow_camera_fps", "Smoothed camera read rate",
+                          lambda: cameras.per_camera(lambda c: round(c.capture.fps, 2)), labelnames=["camera"])
+metrics.REGISTRY.callback("nutriflow_camera_frames_read_total", "Frames read from the camera",
+                          lambda: cameras.per_camera(lambda c: c.capture.frames_read),
+                          kind="counter", labelnames=["camera"])
+metrics.REGISTRY.callback("nutriflow_camera_read_failures_total", "Failed camera reads",
+                          lambda: cameras.per_camera(lambda c: c.capture.read_failures),
+                          kind="counter", labelnames=["camera"])
+metrics.REGISTRY.callback("nutriflow_camera_dropped_frames_total", "Frames dropped because every ring slot was pinned",
+                          lambda: cameras.per_camera(lambda c: c.ring.dropped), kind="counter", labelnames=["camera"])
+metrics.REGISTRY.callback("nutriflow_camera_inferences_total", "Detector calls caused by each camera",
+                          lambda: cameras.per_camera(lambda c: c.inferences), kind="counter", labelnames=["camera"])
+metrics.REGISTRY.callback("nutriflow_camera_inference_share", "Each camera's share of detector calls",
+                          lambda: {camera_id: s["inference_share"] for camera_id, s in cameras.stats().items()},
+                          labelnames=["camera"])
+metrics.REGISTRY.callback("nutriflow_frame_ring_shared", "1 if the frame ring lives in shared memory",
+                          lambda: cameras.per_camera(lambda c: int(c.ring.descriptor() is not None)),
+                          labelnames=["camera"])
+metrics.REGISTRY.callback("nutriflow_inference_pending", "Frames waiting for an inference worker",
+                          lambda: detector.pending if isinstance(detector, InferencePool) else 0)
+metrics.REGISTRY.callback("nutriflow_stream_clients", "Active /video-feed clients",
+                          lambda: cameras.per_camera(lambda c: c.broadcaster.subscribers), labelnames=["camera"])
+metrics.REGISTRY.callback("nutriflow_stream_tiers", "Stream tiers being encoded",
+                          lambda: cameras.per_camera(lambda c: len(c.broadcaster.tiers())), labelnames=["camera"])
+metrics.REGISTRY.callback("nutriflow_meal_cache_lookups_total", "Meal cache lookups by result",
+                          lambda: {"hit": meal_cache.stats()["hits"], "miss": meal_cache.stats()["misses"]},
+                          kind="counter", labelnames=["result"])
+metrics.REGISTRY.callback("nutriflow_meal_cache_hit_ratio", "Meal cache hit rate",
+                          lambda: meal_cache.stats()["hit_rate"])
+metrics.REGISTRY.callback("nutriflow_meal_cache_entries", "Meal cache entries",
+                          lambda: meal_cache.stats()["entries"])
+metrics.REGISTRY.callback("nutriflow_motion_gate_checks_total", "Motion gate decisions by outcome",
+                          lambda: {"skip": cameras.gate_stats()["skips"], "run": cameras.gate_stats()["runs"]},
+                          kind="counter", labelnames=["outcome"])
+metrics.REGISTRY.callback("nutriflow_motion_gate_hit_ratio", "Share of inventory checks served without inference",
+                          lambda: cameras.gate_stats()["hit_rate"])
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+    profiler.begin(threading.get_ident(), request.path)
+
+@app.after_request
+def _record_request_latency(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        metrics.http_request_seconds.observe(time.perf_counter() - started, route=route,
+                                             method=request.method, status=response.status_code)
+    return response
+
+@app.teardown_request
+def _stop_request_profiler(exc):
+    profiler.end(threading.get_ident())
+
+@app.route('/metrics')
+def get_metrics():
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+def admin_allowed():
+    return not config.ADMIN_TOKEN or request.headers.get("X-Admin-Token") == config.ADMIN_TOKEN
+
+@app.route('/admin/profile', methods=['GET', 'POST'])
+def admin_profile():
+    if not admin_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict) or not isinstance(data.get("path") or "", str):
+            return jsonify({"error": "Expected a JSON object with an optional string \"path\""}), 400
+        try:
+            # int()/float() raise TypeError on null, lists and objects
+            profiler.arm(requests=int(data.get("requests", 1)), mode=data.get("mode", "cprofile"),
+                         path_prefix=data.get("path"), interval_ms=float(data.get("interval_ms", 5)))
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+    try:
+        return jsonify(profiler.report(sort=request.args.get("sort", "cumulative"),
+                                       limit=request.args.get("limit", 40, type=int)))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/ready')
+def ready():
+    report = readiness.to_dict()
+    return jsonify(report), 200 if report["ready"] else 503
+
+@app.route('/status')
+def status():
+    camera_active = any(seq > 0 for seq in cameras.latest_seqs().values())
+    session_stats = sessions.stats()
+    session = find_session(request_session_id(), request_user_id(default=None))
+    
+    return jsonify({
+        "capture_running": session_stats["watching"] > 0,
+        "camera_active": camera_active,
+        "camera_source": camera.source.name,
+        "cameras": cameras.stats(),
+        "before_items_count": sum(session.before_items.values()) if session else 0,
+        "current_status": state.status,
+        "awaiting_allergy_confirmation": session_stats["awaiting_confirmation"] > 0,
+        "sessions": session_stats,
+        "coalescing": {"capture_after": capture_flights.stats(), "meal_jobs": meal_jobs.stats()},
+        "meal_cache": meal_cache.stats(),
+        "detector": {"backend": detector.backend, "path": detector.path} if detector else None,
+        "inference_pool": detector.stats() if isinstance(detector, InferencePool) else None,
+        "batching": batcher.stats() if batcher is not None else None,
+        "ready": readiness.is_ready(),
+        "llm": llm.stats(),
+        "motion_gate": cameras.gate_stats(),
+        "profiles": profiles.stats(),
+        "user_profile": current_profile(request_user_id())
+    })
+
+# --- Start ---
+def _start_camera():
+    with readiness.phase(f"camera open + first frame ({len(cameras)} cameras)", "camera"):
+        failed = cameras.start_capture(first_frame_timeout=10)
+        if len(failed) == len(cameras):
+            raise RuntimeError("No frames from camera")
+
+def _start_batcher():
+    global batcher
+    if config.DETECT_MAX_BATCH > 1:
+        batcher = MicroBatcher(detector.detect_batch, max_batch=config.DETECT_MAX_BATCH,
+                               max_wait_ms=config.DETECT_MAX_WAIT_MS).start()
+
+def _start_detector():
+    global detector
+    readiness.set("detector", "loading")
+    try:
+        if config.INFERENCE_WORKERS > 0:
+            # Each worker process loads and warms up its own copy of the model
+            with readiness.phase(f"inference pool start ({config.INFERENCE_WORKERS} workers)", "detector"):
+                detector = InferencePool(config.MODEL_PATH, config.DETECTOR_BACKEND, imgsz=config.DETECTOR_IMGSZ,
+                                         workers=config.INFERENCE_WORKERS, max_pending=config.INFERENCE_QUEUE,
+                                         timeout=config.INFERENCE_TIMEOUT, warmup_runs=config.DETECTOR_WARMUP_RUNS,
+                                         rings=cameras.rings(), batch=config.DETECT_MAX_BATCH).start()
+                _start_batcher()
+            cameras.start_inventory()
+            return
+        with readiness.phase("detector import + load"):
+            loaded = load_detector(config.MODEL_PATH, config.DETECTOR_BACKEND, imgsz=config.DETECTOR_IMGSZ,
+                                   batch=config.DETECT_MAX_BATCH)
+        with readiness.phase("detector warm-up", "detector"):
+            loaded.warm_up(config.DETECTOR_WARMUP_RUNS)
+            detector = loaded
+            _start_batcher()
+    except Exception as e:
+        readiness.set("detector", "failed", str(e))
+        return
+    cameras.start_inventory()
+
+def _start_llm():
+    readiness.set("llm", "loading")
+    with readiness.phase("llm warm-up", "llm"):
+        if not llm.warm_up():
+            raise RuntimeError(f"Could not warm up {llm.model} at {llm.base_url}")
+
+def start_backend():
+    """Returns immediately; every slow component comes up on its own thread and reports to /ready"""
+    for name, target in (("camera", _start_camera), ("detector", _start_detector), ("llm", _start_llm)):
+        readiness.set(name, "pending")
+        threading.Thread(target=_run_startup_step, args=(target,), name=f"startup-{name}", daemon=True).start()
+    cameras.start_streams()
+    sessions.start()
+    llm.start_keep_alive()
+    allergen_database()
+
+def _run_startup_step(target):
+    try:
+        target()
+    except Exception as e:
+        print(f"[STARTUP] {e}")
+
+def stop_backend():
+    sessions.stop()
+    if batcher is not None:
+        batcher.stop()
+    if isinstance(detector, InferencePool):
+        detector.stop()
+    cameras.stop()
+
+def run_flask():
+    app.run(host=config.HOST, port=config.PORT, debug=False, threaded=True)
+
+def main():
+    start_backend()
+    print("🚀 NutriFlow Backend Started (headless)")
+    print("- Allergy checking: ENABLED (confirm via /confirm-allergies)")
+    print("- Calorie estimation: ENABLED")
+    print(f"- Flask API: http://localhost:{config.PORT} (component status on /ready)")
+    try:
+        run_flask()
+    except KeyboardInterrupt:
+        print("Shutting down...")
+    finally:
+        stop_backend()
+
+if __name__ == "__main__":
+    main()
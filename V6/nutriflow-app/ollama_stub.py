@@ -0,0 +1,98 @@
+"""Local stand-in for Ollama's /api/generate with configurable latency, for offline benchmarks.
+
+    python ollama_stub.py --port 11435 --ttft 0.4 --token-delay 0.02 --tokens 300
+"""
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SAMPLE_MEAL = (
+    "MEAL 1: Stub Salad\nDESCRIPTION: A quick benchmark salad.\nCALORIES: 250\n"
+    "INGREDIENTS:\n- apple\n- cucumber\nINSTRUCTIONS:\n1. Chop.\n2. Mix.\n"
+)
+
+
+def make_handler(ttft, token_delay, tokens):
+    words = SAMPLE_MEAL.replace("\n", " \n ").split(" ")
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _write_chunk(self, payload):
+            data = json.dumps(payload).encode("utf-8") + b"\n"
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        def do_POST(self):
+            if self.path != "/api/generate":
+                self.send_error(404)
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+
+            # A request without a prompt only loads the model, like the real server
+            if not request.get("prompt"):
+                self._send_json({"model": request.get("model"), "response": "", "done": True})
+                return
+
+            limit = request.get("options", {}).get("num_predict") or tokens
+            count = min(tokens, limit)
+            pieces = [words[i % len(words)] + " " for i in range(count)]
+            time.sleep(ttft)
+
+            if not request.get("stream", True):
+                time.sleep(token_delay * count)
+                self._send_json({"model": request.get("model"), "response": "".join(pieces), "done": True})
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for index, piece in enumerate(pieces):
+                if index:
+                    time.sleep(token_delay)
+                self._write_chunk({"model": request.get("model"), "response": piece, "done": False})
+            self._write_chunk({"model": request.get("model"), "response": "", "done": True, "eval_count": count})
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+    return StubHandler
+
+
+def make_server(port=11435, ttft=0.4, token_delay=0.02, tokens=300, host="127.0.0.1"):
+    return ThreadingHTTPServer((host, port), make_handler(ttft, token_delay, tokens))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ollama /api/generate stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--ttft", type=float, default=0.4, help="seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between tokens")
+    parser.add_argument("--tokens", type=int, default=300, help="tokens per response")
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.ttft, args.token_delay, args.tokens, args.host)
+    print(f"[STUB] Ollama stub on http://{args.host}:{args.port} "
+          f"(ttft {args.ttft}s, {args.token_delay}s/token, {args.tokens} tokens)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import math
+
+# --- Latency summaries shared by the benchmark and report scripts ---
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (pct in 0..100)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(values_s):
+    """count/mean/p50/p95/p99/max of a list of durations in seconds, reported in milliseconds"""
+    if not values_s:
+        return {"count": 0}
+    to_ms = lambda v: round(v * 1000, 2)
+    return {
+        "count": len(values_s),
+        "mean_ms": to_ms(sum(values_s) / len(values_s)),
+        "p50_ms": to_ms(percentile(values_s, 50)),
+        "p95_ms": to_ms(percentile(values_s, 95)),
+        "p99_ms": to_ms(percentile(values_s, 99)),
+        "max_ms": to_ms(max(values_s)),
+    }
@@ -0,0 +1,176 @@
+import json
+import math
+import re
+import sqlite3
+import threading
+import time
+
+from meal_cache import profile_hash
+
+PROFILE_KEYS = ("name", "allergies", "preferred_items", "risk_factors", "food_cusine", "age")
+LIST_KEYS = ("allergies", "preferred_items", "risk_factors", "food_cusine")
+USER_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.@:-]{1,64}$")
+
+
+class InvalidProfile(ValueError):
+    pass
+
+
+def valid_user_id(user_id):
+    return isinstance(user_id, str) and bool(USER_ID_PATTERN.match(user_id))
+
+
+def check_profile_changes(changes):
+    """Raise InvalidProfile unless every known field has the type the prompt and allergen matcher expect"""
+    for key in LIST_KEYS:
+        if key in changes:
+            value = changes[key]
+            # A bare string would be iterated letter by letter ("peanuts" -> p, e, a, ...)
+            if not isinstance(value, list) or not all(isinstance(entry, str) for entry in value):
+                raise InvalidProfile(f"{key} must be a list of strings")
+    if "name" in changes and not isinstance(changes["name"], str):
+        raise InvalidProfile("name must be a string")
+    if "age" in changes:
+        age = changes["age"]
+        if isinstance(age, bool) or not isinstance(age, (int, float)) or not math.isfinite(age) or age < 0:
+            raise InvalidProfile("age must be a non-negative number")
+
+
+# --- Profile snapshots ---
+class Profile:
+    """Immutable view of one user's profile at one version; derived data is cached on the snapshot"""
+
+    def __init__(self, user_id, data, version=0, updated=None):
+        self.user_id = user_id
+        self.version = version
+        self.updated = updated
+        self._data = {key: data.get(key) for key in PROFILE_KEYS}
+        self.digest = profile_hash(self._data)
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    def to_dict(self):
+        return json.loads(json.dumps(self._data))
+
+    def derived(self, name, build):
+        """Build something from this version once (an allergen matcher, ...); a new version starts fresh"""
+        with self._lock:
+            if name not in self._derived:
+                self._derived[name] = build(self)
+            return self._derived[name]
+
+
+# --- SQLite-backed store ---
+class ProfileStore:
+    """Per-user profiles in SQLite (WAL), served from an in-memory cache of the latest versions.
+
+    This process is expected to own the database: reads never go to disk once a user is cached.
+    path=None keeps everything in memory (benchmarks, tests).
+    """
+
+    def __init__(self, path, defaults):
+        self.path = path
+        self.defaults = {key: defaults.get(key) for key in PROFILE_KEYS}
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS profiles ("
+                " user_id TEXT PRIMARY KEY,"
+                " data TEXT NOT NULL,"
+                " version INTEGER NOT NULL,"
+                " updated REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def _load(self, user_id):
+        if self.path:
+            row = self._connect().execute(
+                "SELECT data, version, updated FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+            if row is not None:
+                data = dict(self.defaults)
+                data.update(json.loads(row[0]))
+                return Profile(user_id, data, row[1], row[2])
+        # Unknown users start from the defaults (version 0) and are only written on their first update
+        return Profile(user_id, self.defaults)
+
+    def get(self, user_id):
+        with self._cache_lock:
+            profile = self._cache.get(user_id)
+            if profile is not None:
+                self.hits += 1
+                return profile
+            self.misses += 1
+        profile = self._load(user_id)
+        with self._cache_lock:
+            # A concurrent update may have cached a newer version while this one was loading
+            current = self._cache.get(user_id)
+            if current is None or current.version < profile.version:
+                self._cache[user_id] = profile
+            return self._cache[user_id]
+
+    def update(self, user_id, changes):
+        """Apply the known fields in `changes` atomically; returns (old_profile, new_profile).
+
+        Raises InvalidProfile (nothing is written) if a field has the wrong type.
+        """
+        changes = {key: value for key, value in changes.items() if key in PROFILE_KEYS}
+        check_profile_changes(changes)
+        with self._write_lock:
+            old = self.get(user_id)
+            data = old.to_dict()
+            data.update(changes)
+            new = Profile(user_id, data, old.version + 1, time.time())
+            if self.path:
+                conn = self._connect()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.execute(
+                        "INSERT INTO profiles (user_id, data, version, updated) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT(user_id) DO UPDATE SET data = excluded.data, "
+                        "version = excluded.version, updated = excluded.updated",
+                        (user_id, json.dumps(new.to_dict()), new.version, new.updated))
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+            # Readers switch to the new snapshot only once it is durable
+            with self._cache_lock:
+                self._cache[user_id] = new
+                self.writes += 1
+        return old, new
+
+    def users(self):
+        if self.path:
+            return [row[0] for row in self._connect().execute("SELECT user_id FROM profiles ORDER BY user_id")]
+        with self._cache_lock:
+            return sorted(user for user, profile in self._cache.items() if profile.version > 0)
+
+    def stats(self):
+        with self._cache_lock:
+            lookups = self.hits + self.misses
+            return {
+                "cached_users": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
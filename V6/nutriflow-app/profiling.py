@@ -0,0 +1,139 @@
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+# --- On-demand request profiler ---
+# Armed through the admin endpoint for the next N requests, then disarms itself. "cprofile" gives
+# exact per-function times; "sample" walks the request thread's stack every few milliseconds and
+# costs far less on a live unit. Only one request is profiled at a time (cProfile cannot nest).
+
+MODES = ("cprofile", "sample")
+SORT_KEYS = tuple(sorted(pstats.Stats.sort_arg_dict_default))
+
+
+class _StackSampler:
+    """Samples one thread's Python stack on a background thread until stopped"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=1)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+
+class RequestProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._busy = threading.Lock()
+        self.remaining = 0
+        self.mode = None
+        self.path_prefix = None
+        self.interval = 0.005
+        self.profiled = []
+        self._stats = None
+        self._samples = Counter()
+        self._active = {}
+
+    def arm(self, requests=1, mode="cprofile", path_prefix=None, interval_ms=5):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        with self._lock:
+            self.remaining = max(1, int(requests))
+            self.mode = mode
+            self.path_prefix = path_prefix
+            self.interval = max(0.001, interval_ms / 1000.0)
+            self.profiled = []
+            self._stats = None
+            self._samples = Counter()
+        print(f"[PROFILE] Armed {mode} for the next {self.remaining} request(s)")
+
+    def begin(self, key, path):
+        """Called before a request; starts profiling it when armed and nothing else is being profiled"""
+        with self._lock:
+            if self.remaining <= 0 or (self.path_prefix and not path.startswith(self.path_prefix)):
+                return
+            if not self._busy.acquire(blocking=False):
+                return
+            self.remaining -= 1
+            mode = self.mode
+        if mode == "cprofile":
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError as e:
+                # Another profiler (a debugger, py-spy in-process) already owns the hook
+                print(f"[PROFILE] Cannot profile {path}: {e}")
+                self._busy.release()
+                return
+        else:
+            profiler = _StackSampler(threading.get_ident(), self.interval)
+            profiler.start()
+        self._active[key] = (profiler, path, time.perf_counter())
+
+    def end(self, key):
+        entry = self._active.pop(key, None)
+        if entry is None:
+            return
+        profiler, path, started = entry
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+        else:
+            profiler.stop()
+        with self._lock:
+            if isinstance(profiler, cProfile.Profile):
+                if self._stats is None:
+                    self._stats = pstats.Stats(profiler)
+                else:
+                    self._stats.add(profiler)
+            else:
+                self._samples.update(profiler.counts)
+            self.profiled.append({"path": path, "ms": round((time.perf_counter() - started) * 1000, 2)})
+            if self.remaining <= 0:
+                print(f"[PROFILE] Done, {len(self.profiled)} request(s) profiled")
+        self._busy.release()
+
+    def report(self, sort="cumulative", limit=40):
+        if sort not in SORT_KEYS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_KEYS)}")
+        with self._lock:
+            result = {
+                "mode": self.mode,
+                "remaining": self.remaining,
+                "profiled_requests": list(self.profiled),
+            }
+            if self.mode == "cprofile" and self._stats is not None:
+                out = io.StringIO()
+                self._stats.stream = out
+                self._stats.sort_stats(sort).print_stats(limit)
+                result["report"] = out.getvalue()
+            elif self.mode == "sample":
+                total = sum(self._samples.values())
+                # Collapsed stacks ("a;b;c count"), ready for flamegraph.pl / speedscope
+                result["samples"] = total
+                result["report"] = "\n".join(f"{stack} {count}" for stack, count in self._samples.most_common(limit))
+            else:
+                result["report"] = ""
+            return result
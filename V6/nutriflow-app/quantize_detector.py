@@ -0,0 +1,246 @@
+"""Post-training INT8 quantization of the fridge detector, with an FP32 vs INT8 comparison report.
+
+Usage:
+    python quantize_detector.py --frames path/to/fridge_frames [--eval-frames other_frames]
+
+The INT8 model is written next to the weights as <stem>_int8_openvino_model and is picked up by
+the backend with NUTRIFLOW_DETECTOR_BACKEND=int8.
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from collections import defaultdict
+from queue import Empty
+
+import config
+from perf_stats import summarize
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def list_frames(folder):
+    return sorted(p for p in glob.glob(os.path.join(folder, "*")) if p.lower().endswith(IMAGE_EXTENSIONS))
+
+
+# --- Calibration ---
+def quantize(weights, frames_dir, imgsz, fraction=1.0):
+    """Export an INT8 OpenVINO model calibrated on our own fridge frames"""
+    from ultralytics import YOLO
+
+    import yaml
+
+    model = YOLO(weights)
+    work_dir = tempfile.mkdtemp(prefix="nutriflow_calib_")
+    try:
+        # Ultralytics calibrates on the dataset's val split; labels are not needed for that
+        data_yaml = os.path.join(work_dir, "calibration.yaml")
+        with open(data_yaml, "w") as f:
+            yaml.safe_dump({
+                "path": os.path.abspath(frames_dir),
+                "train": ".",
+                "val": ".",
+                "names": dict(model.names),
+            }, f)
+        exported = model.export(format="openvino", int8=True, data=data_yaml, imgsz=imgsz, fraction=fraction)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return exported
+
+
+# --- Evaluation (one child process per model so peak memory is measured in isolation) ---
+def _peak_memory_mb():
+    """Peak RSS of this process's own address space.
+
+    Not ru_maxrss: Linux carries that over from the parent through fork and even exec, so a child
+    of a parent that already ran the export would report the parent's peak.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024.0  # kB
+    except OSError:
+        pass
+    try:
+        import psutil
+
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024.0 * 1024.0)
+    except ImportError:
+        return None
+
+
+def _run_model(path, frame_paths, imgsz, warmup, queue):
+    try:
+        queue.put(_measure_model(path, frame_paths, imgsz, warmup))
+    except Exception as e:
+        # Bad path, missing OpenVINO runtime, ...: report it instead of leaving the parent waiting
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def _measure_model(path, frame_paths, imgsz, warmup):
+    import cv2
+    from ultralytics import YOLO
+
+    model = YOLO(path, task="detect")
+    frames = [cv2.imread(p) for p in frame_paths]
+    for frame in frames[:warmup]:
+        model(frame, imgsz=imgsz, verbose=False)
+
+    latencies = []
+    detections = []
+    for frame in frames:
+        started = time.perf_counter()
+        result = model(frame, imgsz=imgsz, verbose=False)[0]
+        latencies.append(time.perf_counter() - started)
+        detections.append([
+            (int(cls), box)
+            for cls, box in zip(result.boxes.cls.tolist(), result.boxes.xyxy.tolist())
+        ])
+    return {
+        "names": dict(model.names),
+        "latencies": latencies,
+        "detections": detections,
+        "peak_memory_mb": _peak_memory_mb(),
+    }
+
+
+def evaluate(path, frame_paths, imgsz, warmup=3):
+    # A fresh interpreter rather than a fork: it has not imported torch or run the export
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    worker = ctx.Process(target=_run_model, args=(path, frame_paths, imgsz, warmup, queue))
+    worker.start()
+    while True:
+        try:
+            result = queue.get(timeout=1.0)
+            break
+        except Empty:
+            # Killed outright (OOM, segfault in a runtime) without a chance to report
+            if not worker.is_alive():
+                raise SystemExit(f"Evaluating {path} failed: worker exited with code {worker.exitcode}")
+    worker.join()
+    if "error" in result:
+        raise SystemExit(f"Evaluating {path} failed: {result['error']}")
+    return result
+
+
+# --- Comparison ---
+def iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def per_class_agreement(reference, candidate, names, iou_threshold=0.5):
+    """Precision/recall of the candidate model, using the FP32 detections as ground truth"""
+    tp, fp, fn = defaultdict(int), defaultdict(int), defaultdict(int)
+    for ref_boxes, cand_boxes in zip(reference, candidate):
+        unmatched = list(ref_boxes)
+        for cls, box in cand_boxes:
+            best, best_iou = None, iou_threshold
+            for ref in unmatched:
+                overlap = iou(box, ref[1])
+                if ref[0] == cls and overlap >= best_iou:
+                    best, best_iou = ref, overlap
+            if best is None:
+                fp[cls] += 1
+            else:
+                tp[cls] += 1
+                unmatched.remove(best)
+        for cls, _ in unmatched:
+            fn[cls] += 1
+
+    report = {}
+    for cls in sorted(set(tp) | set(fp) | set(fn)):
+        predicted = tp[cls] + fp[cls]
+        actual = tp[cls] + fn[cls]
+        report[names.get(cls, str(cls))] = {
+            "precision": round(tp[cls] / predicted, 3) if predicted else None,
+            "recall": round(tp[cls] / actual, 3) if actual else None,
+            "fp32_detections": actual,
+            "int8_detections": predicted,
+        }
+    return report
+
+
+def write_report(report, out_prefix):
+    with open(out_prefix + ".json", "w") as f:
+        json.dump(report, f, indent=2)
+
+    lines = [
+        "# NutriFlow detector: FP32 vs INT8",
+        "",
+        f"Frames evaluated: {report['frames']}",
+        "",
+        "| model | p50 ms | p95 ms | peak memory MB |",
+        "|---|---|---|---|",
+    ]
+    for label in ("fp32", "int8"):
+        stats = report[label]
+        memory = stats["peak_memory_mb"]
+        lines.append(f"| {label} ({stats['path']}) | {stats['latency']['p50_ms']} | "
+                     f"{stats['latency']['p95_ms']} | {round(memory, 1) if memory else 'n/a'} |")
+    lines += [
+        "",
+        f"Speed-up (p50): {report['speedup_p50']}x",
+        "",
+        "| class | precision | recall | fp32 boxes | int8 boxes |",
+        "|---|---|---|---|---|",
+    ]
+    for name, row in report["per_class"].items():
+        lines.append(f"| {name} | {row['precision']} | {row['recall']} | "
+                     f"{row['fp32_detections']} | {row['int8_detections']} |")
+    with open(out_prefix + ".md", "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="INT8 quantization and FP32/INT8 comparison for the fridge detector")
+    parser.add_argument("--weights", default=config.MODEL_PATH)
+    parser.add_argument("--frames", required=True, help="folder of fridge frames used for calibration")
+    parser.add_argument("--eval-frames", help="folder of frames for the comparison (defaults to --frames)")
+    parser.add_argument("--imgsz", type=int, default=config.DETECTOR_IMGSZ)
+    parser.add_argument("--fraction", type=float, default=1.0, help="share of calibration frames to use")
+    parser.add_argument("--skip-export", action="store_true", help="only re-run the comparison")
+    parser.add_argument("--report", default="quantization_report", help="output prefix for .json/.md")
+    args = parser.parse_args()
+
+    from detectors import exported_path
+
+    int8_path = exported_path(args.weights, "int8")
+    if not args.skip_export:
+        int8_path = quantize(args.weights, args.frames, args.imgsz, args.fraction)
+        print(f"[QUANT] INT8 model written to {int8_path}")
+
+    frame_paths = list_frames(args.eval_frames or args.frames)
+    if not frame_paths:
+        raise SystemExit("No frames to evaluate")
+
+    print(f"[QUANT] Evaluating FP32 and INT8 on {len(frame_paths)} frames...")
+    fp32 = evaluate(args.weights, frame_paths, args.imgsz)
+    int8 = evaluate(int8_path, frame_paths, args.imgsz)
+
+    fp32_latency = summarize(fp32["latencies"])
+    int8_latency = summarize(int8["latencies"])
+    report = {
+        "frames": len(frame_paths),
+        "imgsz": args.imgsz,
+        "fp32": {"path": args.weights, "latency": fp32_latency, "peak_memory_mb": fp32["peak_memory_mb"]},
+        "int8": {"path": int8_path, "latency": int8_latency, "peak_memory_mb": int8["peak_memory_mb"]},
+        "speedup_p50": round(fp32_latency["p50_ms"] / int8_latency["p50_ms"], 2) if int8_latency["p50_ms"] else None,
+        "per_class": per_class_agreement(fp32["detections"], int8["detections"], fp32["names"]),
+    }
+    write_report(report, args.report)
+    print(f"[QUANT] Report written to {args.report}.json and {args.report}.md")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+# --- Component readiness and startup timing ---
+class Readiness:
+    """Tracks the state of each backend component and how long every startup phase took"""
+
+    def __init__(self, required=()):
+        self.required = tuple(required)
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._components = {}
+        self._phases = []
+
+    def set(self, component, status, error=None):
+        with self._lock:
+            entry = self._components.setdefault(component, {"state": "pending"})
+            entry["state"] = status
+            entry["since_start_s"] = round(time.time() - self.started, 3)
+            if error is not None:
+                entry["error"] = error
+            else:
+                entry.pop("error", None)
+
+    def record_phase(self, phase, seconds):
+        with self._lock:
+            self._phases.append({"phase": phase, "seconds": round(seconds, 3)})
+        print(f"[STARTUP] {phase}: {seconds:.2f}s")
+
+    @contextmanager
+    def phase(self, phase, component=None):
+        """Time a startup phase; when a component is given its state follows the phase"""
+        if component:
+            self.set(component, "starting")
+        started = time.time()
+        try:
+            yield
+        except Exception as e:
+            self.record_phase(f"{phase} (failed)", time.time() - started)
+            if component:
+                self.set(component, "failed", str(e))
+            raise
+        self.record_phase(phase, time.time() - started)
+        if component:
+            self.set(component, "ready")
+
+    def is_ready(self, component=None):
+        with self._lock:
+            names = (component,) if component else self.required
+            return all(self._components.get(name, {}).get("state") == "ready" for name in names)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "ready": all(self._components.get(name, {}).get("state") == "ready" for name in self.required),
+                "uptime_s": round(time.time() - self.started, 1),
+                "components": {name: dict(entry) for name, entry in self._components.items()},
+                "startup_phases": list(self._phases),
+            }
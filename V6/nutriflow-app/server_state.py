@@ -0,0 +1,29 @@
+import threading
+
+
+# --- Thread-safe backend state ---
+class ServerState:
+    """Status text shared by Flask threads and optional GUIs"""
+
+    def __init__(self, status="Ready"):
+        self._lock = threading.Lock()
+        self._status = status
+        self._listeners = []
+
+    @property
+    def status(self):
+        with self._lock:
+            return self._status
+
+    def set_status(self, message):
+        with self._lock:
+            self._status = message
+            listeners = list(self._listeners)
+        print(f"[STATUS] {message}")
+        for listener in listeners:
+            listener(message)
+
+    def add_status_listener(self, listener):
+        """Listeners run on the thread that changed the status; GUIs must marshal to their own loop"""
+        with self._lock:
+            self._listeners.append(listener)
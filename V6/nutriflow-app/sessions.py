@@ -0,0 +1,199 @@
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+
+
+class SessionLimitReached(RuntimeError):
+    pass
+
+
+# --- Capture sessions ---
+class CaptureSession:
+    """One before/after capture: its own baseline, owner and pending allergy confirmation"""
+
+    def __init__(self, user_id, before_items, before_seq, before_by_camera=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.user_id = user_id
+        self.before_items = Counter(before_items)
+        self.before_seq = before_seq  # {camera_id: frame seq} of the baseline
+        self.before_by_camera = before_by_camera or {}
+        self.after_items = None
+        self.after_seq = None  # newest camera frame when /capture-after was first requested
+        self.created = time.time()
+        self.last_active = self.created
+        self.closed_at = None
+        self.status = "watching"  # watching -> analyzing -> awaiting_confirmation -> closed
+        self.pending = None
+        self.watching = False
+        self.lock = threading.Lock()  # serialises capture-after / confirm on the same session
+
+    def touch(self):
+        self.last_active = time.time()
+
+    def to_dict(self):
+        return {
+            "session_id": self.id,
+            "user_id": self.user_id,
+            "status": self.status,
+            "before_items": dict(self.before_items),
+            "before_seq": self.before_seq,
+            "before_by_camera": {camera_id: dict(items) for camera_id, items in self.before_by_camera.items()},
+            "age_s": round(time.time() - self.created, 1),
+            "idle_s": round(time.time() - self.last_active, 1),
+        }
+
+
+class SessionManager:
+    """Bounded set of open capture sessions; idle ones are expired by a single reaper thread.
+
+    on_watch/on_unwatch run when a session starts/stops needing the background detector, so the
+    shared inventory tracker samples at the active rate exactly while someone is watching.
+    """
+
+    def __init__(self, max_sessions=8, idle_timeout=600, on_watch=None, on_unwatch=None, reap_interval=30,
+                 keep_closed=32):
+        self.max_sessions = max_sessions
+        self.keep_closed = keep_closed
+        self.idle_timeout = idle_timeout
+        self.reap_interval = reap_interval
+        self._on_watch = on_watch
+        self._on_unwatch = on_unwatch
+        self._sessions = OrderedDict()
+        self._closed = OrderedDict()  # the last few closed sessions, so late duplicates can still find them
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.created = 0
+        self.expired = 0
+        self.rejected = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._reap_loop, name="session-reaper", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def create(self, user_id, before_items, before_seq, before_by_camera=None):
+        self.reap()
+        session = CaptureSession(user_id, before_items, before_seq, before_by_camera)
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                self.rejected += 1
+                raise SessionLimitReached(f"Too many open capture sessions ({self.max_sessions})")
+            self._sessions[session.id] = session
+            self.created += 1
+        self.watch(session)
+        return session
+
+    def get(self, session_id, closed_within=None):
+        """An open session; with closed_within, also one closed at most that many seconds ago"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None and closed_within:
+                closed = self._closed.get(session_id)
+                if closed is not None and time.time() - closed.closed_at <= closed_within:
+                    return closed
+        if session is not None:
+            session.touch()
+        return session
+
+    def latest(self, user_id=None, status=None):
+        """Most recently used open session (optionally for one user / in one status or tuple of them)"""
+        statuses = (status,) if isinstance(status, str) else status
+        with self._lock:
+            sessions = list(self._sessions.values())
+        candidates = [s for s in sessions
+                      if (user_id is None or s.user_id == user_id) and (statuses is None or s.status in statuses)]
+        return max(candidates, key=lambda s: s.last_active) if candidates else None
+
+    def recently_closed(self, user_id=None, within=0):
+        """Most recently closed session (optionally for one user) if it closed within `within` seconds"""
+        cutoff = time.time() - within
+        with self._lock:
+            candidates = [s for s in self._closed.values()
+                          if (user_id is None or s.user_id == user_id) and s.closed_at >= cutoff]
+        return max(candidates, key=lambda s: s.closed_at) if candidates else None
+
+    def pin_after_seq(self, session, seq):
+        """Record the frame the first /capture-after saw; duplicates get the same seq back"""
+        with self._lock:
+            if session.after_seq is None:
+                session.after_seq = seq
+            return session.after_seq
+
+    def unpin_after_seq(self, session):
+        with self._lock:
+            session.after_seq = None
+
+    def watch(self, session):
+        with self._lock:
+            if session.watching:
+                return
+            session.watching = True
+        if self._on_watch is not None:
+            self._on_watch(session)
+
+    def unwatch(self, session):
+        with self._lock:
+            if not session.watching:
+                return
+            session.watching = False
+        if self._on_unwatch is not None:
+            self._on_unwatch(session)
+
+    def close(self, session, status="closed"):
+        self.unwatch(session)
+        session.status = status
+        session.pending = None
+        with self._lock:
+            if self._sessions.pop(session.id, None) is not None:
+                session.closed_at = time.time()
+                self._closed[session.id] = session
+                while len(self._closed) > self.keep_closed:
+                    self._closed.popitem(last=False)
+
+    def close_all(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+        for session in sessions:
+            self.close(session)
+        return len(sessions)
+
+    def reap(self):
+        """Expire sessions idle for longer than idle_timeout; returns how many were dropped"""
+        cutoff = time.time() - self.idle_timeout
+        with self._lock:
+            idle = [s for s in self._sessions.values() if s.last_active < cutoff]
+        for session in idle:
+            print(f"[SESSION] Expiring idle session {session.id} ({session.user_id})")
+            self.close(session, status="expired")
+        with self._lock:
+            self.expired += len(idle)
+        return len(idle)
+
+    def _reap_loop(self):
+        while not self._stop.wait(self.reap_interval):
+            self.reap()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def stats(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            return {
+                "open": len(sessions),
+                "watching": sum(1 for s in sessions if s.watching),
+                "awaiting_confirmation": sum(1 for s in sessions if s.status == "awaiting_confirmation"),
+                "max_sessions": self.max_sessions,
+                "created": self.created,
+                "expired": self.expired,
+                "rejected": self.rejected,
+            }
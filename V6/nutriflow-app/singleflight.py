@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.finished = None
+        self.waiters = 0
+
+
+# --- Single-flight request coalescing ---
+class SingleFlight:
+    """Concurrent calls with the same key share one execution and its result (or exception).
+
+    With linger > 0 a finished result keeps answering the same key for that many seconds, so a
+    duplicate that arrives just after the first call returned (a double-click) is not re-run either.
+    """
+
+    def __init__(self, name, linger=0.0, max_recent=64):
+        self.name = name
+        self.linger = linger
+        self.max_recent = max_recent
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._recent = OrderedDict()
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key, fn, *args):
+        """Returns (result, shared); shared is True when another caller did the work"""
+        with self._lock:
+            call = self._inflight.get(key)
+            if call is None:
+                call = self._recent_call(key)
+            if call is not None:
+                call.waiters += 1
+                self.shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._inflight[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            metrics.coalesced_requests.inc(kind=self.name)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            call.finished = time.time()
+            with self._lock:
+                self._inflight.pop(key, None)
+                if self.linger > 0 and call.error is None:
+                    self._recent[key] = call
+                    while len(self._recent) > self.max_recent:
+                        self._recent.popitem(last=False)
+            call.done.set()
+        return call.result, False
+
+    def _recent_call(self, key):
+        call = self._recent.get(key)
+        if call is None:
+            return None
+        if time.time() - call.finished > self.linger:
+            del self._recent[key]
+            return None
+        return call
+
+    def stats(self):
+        with self._lock:
+            return {"executed": self.executed, "shared": self.shared, "in_flight": len(self._inflight)}
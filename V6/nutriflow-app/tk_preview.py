@@ -0,0 +1,75 @@
+import tkinter as tk
+from tkinter import messagebox
+
+import cv2
+from PIL import Image, ImageTk
+
+
+# --- Optional Tk preview for units with a display ---
+class TkPreview:
+    """Desktop window on top of the headless server: live preview, status line and buttons"""
+
+    def __init__(self, server):
+        self.server = server
+        self.root = tk.Tk()
+        self.root.title("NutriFlow Fridge Tracker")
+        self.video_label = tk.Label(self.root)
+        self.video_label.pack()
+
+        self.status_label = tk.Label(self.root, text=server.state.status, bg="lightgray", font=("Arial", 10))
+        self.status_label.pack(fill="x", padx=10, pady=5)
+
+        tk.Button(self.root, text="📷 Capture Full Fridge", command=self.capture_before, width=30).pack(pady=10)
+        tk.Button(self.root, text="🍽 What Was Taken?", command=self.what_was_taken, width=30).pack(pady=10)
+        tk.Button(self.root, text="🔄 Clear Status", command=server.reset_capture, width=30).pack(pady=5)
+
+        self._shown_seq = 0
+        self.session_id = None
+        # Status changes come from Flask threads; Tk widgets may only be touched from the main loop
+        server.state.add_status_listener(
+            lambda message: self.root.after(0, lambda: self.status_label.config(text=message))
+        )
+
+    def update_video(self):
+        # Preview only: camera reads happen on the capture thread, so a slow GUI just skips frames
+        view = self.server.camera.ring.latest()
+        if view is not None and view.seq != self._shown_seq:
+            with view:
+                self._shown_seq = view.seq
+                frame_rgb = cv2.cvtColor(view.frame, cv2.COLOR_BGR2RGB)
+            img = Image.fromarray(frame_rgb)
+            imgtk = ImageTk.PhotoImage(image=img)
+            self.video_label.imgtk = imgtk
+            self.video_label.configure(image=imgtk)
+
+        self.video_label.after(33, self.update_video)
+
+    def detector_ready(self):
+        if self.server.readiness.is_ready("detector"):
+            return True
+        self.server.update_status("Detector is still warming up, try again shortly")
+        return False
+
+    def capture_before(self):
+        if not self.detector_ready():
+            return
+        try:
+            result = self.server.handle_capture_before()
+        except self.server.SessionLimitReached as e:
+            self.server.update_status(f"ERROR: {e}")
+            return
+        self.session_id = result.get("session_id")
+
+    def what_was_taken(self):
+        if not self.detector_ready():
+            return
+        result = self.server.compare_and_summarize(session_id=self.session_id)
+        if result.get("needs_confirmation"):
+            warning_text = "\n".join(w["warning"] for w in result["allergy_warnings"])
+            warning_text += "\n\nDo you want to continue with meal suggestions anyway?"
+            self.server.confirm_allergies(messagebox.askyesno("⚠️ ALLERGY WARNING", warning_text),
+                                          session_id=result["session_id"])
+
+    def run(self):
+        self.update_video()
+        self.root.mainloop()
@@ -0,0 +1,101 @@
+import json
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# --- Per-request stage tracing ---
+# A trace is bound to the calling thread, so code deep inside a request (detection, allergy checks)
+# can open spans without the trace being passed around. Outside a trace, span() costs one lookup.
+
+_local = threading.local()
+
+
+class Trace:
+    """Stage timings for one operation; logged as a single JSON line when it finishes"""
+
+    def __init__(self, name):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.started = time.perf_counter()
+        self.total_ms = None
+        self.spans = []
+        self.fields = {}
+        self._depth = 0
+
+    @contextmanager
+    def span(self, stage):
+        started = time.perf_counter()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self.spans.append({
+                "stage": stage,
+                "start_ms": round((started - self.started) * 1000, 2),
+                "ms": round((time.perf_counter() - started) * 1000, 2),
+                "depth": self._depth,
+            })
+
+    def finish(self):
+        self.total_ms = round((time.perf_counter() - self.started) * 1000, 2)
+        # Nested spans close before their parents; report them in start order
+        self.spans.sort(key=lambda s: (s["start_ms"], s["depth"]))
+        log_event("trace", trace_id=self.id, name=self.name, total_ms=self.total_ms,
+                  stages=self.spans, **self.fields)
+
+    def to_dict(self):
+        return {"trace_id": self.id, "total_ms": self.total_ms, "stages": list(self.spans)}
+
+
+def current():
+    return getattr(_local, "trace", None)
+
+
+def current_id():
+    trace = current()
+    return trace.id if trace is not None else None
+
+
+@contextmanager
+def trace(name):
+    """Start a trace on this thread; nested calls join the outer trace instead of starting a new one"""
+    outer = current()
+    if outer is not None:
+        with outer.span(name):
+            yield outer
+        return
+    t = Trace(name)
+    _local.trace = t
+    try:
+        yield t
+    finally:
+        _local.trace = None
+        t.finish()
+
+
+@contextmanager
+def span(stage):
+    t = current()
+    if t is None:
+        yield
+        return
+    with t.span(stage):
+        yield
+
+
+def annotate(**fields):
+    """Attach extra fields (item counts, cache hits, ...) to the current trace's log line"""
+    t = current()
+    if t is not None:
+        t.fields.update(fields)
+
+
+def log_event(event, **fields):
+    """One structured JSON log line on stdout"""
+    record = {"ts": round(time.time(), 3), "event": event}
+    record.update(fields)
+    sys.stdout.write(json.dumps(record, default=str) + "\n")
+    sys.stdout.flush()